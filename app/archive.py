@@ -0,0 +1,211 @@
+"""Content-addressed contract archive with a SQLite index."""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .sqlite_store import SQLiteStore, add_find_arguments, find_query
+
+
+def contract_digest(pdf_bytes: bytes) -> str:
+    """Return the SHA-256 hex digest the archive stores a PDF under."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def contract_filename(data: Dict[str, str]) -> str:
+    """Human-readable file name for a contract (downloads, attachments)."""
+    contract_no = data.get("no", "").replace("/", "-")
+    return f"contract_{data['student_last_name']}_{data['student_first_name']}_{contract_no}.pdf"
+
+
+class ContractArchive(SQLiteStore):
+    """Store contract PDFs by content hash and index them in SQLite.
+
+    A PDF lives at `root/ab/cd/abcd....pdf` (its SHA-256, sharded by the
+    first two byte pairs so no directory grows large); rendering the same
+    data twice yields the same bytes, so the file is written only once.
+    The index maps contract number, student, contact email and CNP to the
+    stored hash, so finding a contract never scans directories or reads
+    the sheet.
+    """
+
+    def __init__(self, root: str, db_path: str):
+        """Open (or create) the archive.
+
+        Args:
+            root: Folder the sharded PDF files are stored under
+            db_path: Path to the SQLite index database
+        """
+        super().__init__(db_path)
+        self.root = Path(root)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS contracts (
+                contract_no TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                student_first_name TEXT NOT NULL,
+                student_last_name TEXT NOT NULL,
+                contact_first_name TEXT NOT NULL,
+                contact_last_name TEXT NOT NULL,
+                contact_email TEXT NOT NULL,
+                cnp TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (contract_no, sha256)
+            );
+            CREATE INDEX IF NOT EXISTS contracts_sha256 ON contracts (sha256);
+            CREATE INDEX IF NOT EXISTS contracts_email ON contracts (contact_email);
+            CREATE INDEX IF NOT EXISTS contracts_cnp ON contracts (cnp);
+            CREATE INDEX IF NOT EXISTS contracts_student ON contracts (student_last_name, student_first_name);
+            """
+        )
+        self._conn.commit()
+
+    def path_for(self, digest: str) -> Path:
+        """Return the file path of the PDF with the given SHA-256."""
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.pdf"
+
+    def store(self, pdf_bytes: bytes, data: Dict[str, str], digest: Optional[str] = None) -> Dict[str, Any]:
+        """Archive a rendered contract and index it.
+
+        Args:
+            pdf_bytes: Contract PDF content
+            data: Form data the contract was rendered from
+            digest: SHA-256 of `pdf_bytes`, if already computed
+
+        Returns:
+            The index record of the contract
+        """
+        digest = digest or contract_digest(pdf_bytes)
+        path = self.path_for(digest)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial PDF
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pdf_bytes)
+                os.replace(tmp_path, path)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO contracts (
+                    contract_no, sha256, size, filename,
+                    student_first_name, student_last_name,
+                    contact_first_name, contact_last_name, contact_email, cnp,
+                    created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (contract_no, sha256) DO UPDATE SET updated_at = excluded.updated_at
+                """,
+                (
+                    data["no"], digest, len(pdf_bytes), contract_filename(data),
+                    data["student_first_name"], data["student_last_name"],
+                    data["contact_first_name"], data["contact_last_name"],
+                    data["contact_email"].lower(), data["contact_personal_no"],
+                    now, now
+                )
+            )
+            self._conn.commit()
+
+        return self.get(data["no"], digest)
+
+    def read(self, digest: str) -> Optional[bytes]:
+        """Return the archived PDF with the given SHA-256, or None."""
+        try:
+            return self.path_for(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def get(self, contract_no: str, digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the latest index record of a contract, or None.
+
+        Args:
+            contract_no: Contract number, e.g. "007/2025"
+            digest: Only return the record of this exact render
+        """
+        query = "SELECT * FROM contracts WHERE contract_no = ?"
+        params: List[Any] = [contract_no]
+        if digest:
+            query += " AND sha256 = ?"
+            params.append(digest)
+        query += " ORDER BY updated_at DESC LIMIT 1"
+
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return self._record(row) if row else None
+
+    def find(
+        self,
+        contract_no: Optional[str] = None,
+        contact_email: Optional[str] = None,
+        cnp: Optional[str] = None,
+        student_last_name: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Find archived contracts by any combination of indexed fields.
+
+        Returns:
+            Matching index records, most recently archived first
+        """
+        query, params = find_query(
+            "contracts",
+            (
+                ("contract_no", contract_no),
+                ("contact_email", contact_email.lower() if contact_email else None),
+                ("cnp", cnp),
+                ("student_last_name", student_last_name),
+            ),
+            "updated_at DESC",
+            limit
+        )
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._record(row) for row in rows]
+
+    def _record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["path"] = str(self.path_for(record["sha256"]))
+        return record
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: look up archived contracts."""
+    parser = argparse.ArgumentParser(description="Find archived contracts.")
+    add_find_arguments(parser)
+    parser.add_argument("--student", default=None, help="Student last name")
+    args = parser.parse_args(argv)
+
+    archive = ContractArchive(settings.output_folder, settings.archive_db_path)
+    try:
+        records = archive.find(
+            contract_no=args.no,
+            contact_email=args.email,
+            cnp=args.cnp,
+            student_last_name=args.student,
+            limit=args.limit
+        )
+    finally:
+        archive.close()
+
+    print(json.dumps(records, indent=2, ensure_ascii=False))
+    return 0 if records else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
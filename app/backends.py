@@ -0,0 +1,389 @@
+"""Pluggable Google Sheets and Gmail backends.
+
+The services talk to a backend object instead of calling gspread and the
+Gmail API directly. The Google backends are used in production; the fake
+backends keep everything in memory and emulate latency, random errors and
+quota throttling (HTTP 429), for load tests and benchmarks without
+credentials, network access or real quotas.
+"""
+import abc
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import httplib2
+import requests
+from googleapiclient.errors import HttpError
+from gspread.exceptions import APIError, WorksheetNotFound
+
+
+class SheetsBackend(abc.ABC):
+    """Opens the spreadsheet that SheetsService writes to.
+
+    The returned object must behave like a `gspread.Spreadsheet` for the
+    calls SheetsService makes (`title`, `worksheet`, `add_worksheet`, and on
+    worksheets `row_values`, `insert_row`, `append_rows`, `batch_update`,
+    `col_values`, `get` and `find`).
+    """
+
+    # Whether a service account file is needed to connect
+    requires_credentials_file = True
+
+    @abc.abstractmethod
+    def open(self, credentials_file: str, spreadsheet_id: str, scopes: List[str]):
+        """Return the spreadsheet with the given ID."""
+
+
+class GmailBackend(abc.ABC):
+    """Creates the client EmailService sends messages with.
+
+    The returned object must provide `send(body=None, **kwargs)`,
+    `get_metrics()` and `close()` like `GmailClient`.
+    """
+
+    # Whether OAuth2 client credentials are needed to connect
+    requires_credentials = True
+
+    @abc.abstractmethod
+    def connect(self, client_id: str, client_secret: str, refresh_token: str, scopes: List[str]):
+        """Return a Gmail client authorized with the given credentials."""
+
+
+class GoogleSheetsBackend(SheetsBackend):
+    """Google Sheets through gspread and a service account."""
+
+    def open(self, credentials_file: str, spreadsheet_id: str, scopes: List[str]):
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        credentials = Credentials.from_service_account_file(credentials_file, scopes=scopes)
+        return gspread.authorize(credentials).open_by_key(spreadsheet_id)
+
+
+class GoogleGmailBackend(GmailBackend):
+    """Gmail API with OAuth2 user credentials."""
+
+    def connect(self, client_id: str, client_secret: str, refresh_token: str, scopes: List[str]):
+        from .email_service import GmailClient
+
+        return GmailClient(client_id, client_secret, refresh_token, scopes)
+
+
+class FakeConditions:
+    """Latency, error rate and quota shared by the calls of a fake backend.
+
+    Args:
+        latency: Seconds added to every call
+        jitter: Random extra latency, as a fraction of `latency`
+        error_rate: Probability (0-1) that a call fails with HTTP 500
+        quota: Calls allowed per `quota_window` seconds before calls are
+            rejected with HTTP 429 (0 = unlimited)
+        quota_window: Length of the quota window in seconds
+
+    Tests can also make given calls fail with `fail_next`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        quota: int = 0,
+        quota_window: float = 60.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota = quota
+        self.quota_window = quota_window
+        self._calls: deque = deque()
+        self._failures: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def fail_next(self, call: str, status: int, times: int = 1):
+        """Make the next `times` calls named `call` fail with `status`.
+
+        Args:
+            call: Method name of the fake call, e.g. "append_rows" or "send"
+            status: HTTP error status the calls fail with
+            times: Number of calls to fail
+        """
+        with self._lock:
+            self._failures.setdefault(call, deque()).extend([status] * times)
+
+    def check(self, call: Optional[str] = None) -> Optional[int]:
+        """Apply one call's latency; return an HTTP error status or None."""
+        if self.latency:
+            time.sleep(self.latency * (1 + random.uniform(0, self.jitter)))
+
+        with self._lock:
+            failures = self._failures.get(call)
+            if failures:
+                return failures.popleft()
+
+        if self.quota:
+            now = time.monotonic()
+            with self._lock:
+                while self._calls and self._calls[0] <= now - self.quota_window:
+                    self._calls.popleft()
+                if len(self._calls) >= self.quota:
+                    return 429
+                self._calls.append(now)
+
+        if self.error_rate and random.random() < self.error_rate:
+            return 500
+
+        return None
+
+
+def _sheets_error(status: int, message: Optional[str] = None) -> APIError:
+    """Build the gspread error a real API response with `status` raises."""
+    message = message or ("Quota exceeded" if status == 429 else "Internal error")
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": message, "status": message}}).encode()
+    return APIError(response)
+
+
+class FakeWorksheet:
+    """In-memory worksheet emulating the gspread calls SheetsService uses.
+
+    Like a real sheet it has a grid of `row_count` rows that appends grow;
+    reading a range that starts below the grid fails with HTTP 400.
+    """
+
+    def __init__(self, title: str, conditions: FakeConditions, row_count: int = 1000):
+        self.title = title
+        self.conditions = conditions
+        self.row_count = row_count
+        self.rows: List[List[Any]] = []
+        self._lock = threading.Lock()
+
+    def _call(self, name: str):
+        status = self.conditions.check(name)
+        if status:
+            raise _sheets_error(status)
+
+    def row_values(self, row: int) -> List[Any]:
+        self._call("row_values")
+        with self._lock:
+            return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col: int) -> List[Any]:
+        self._call("col_values")
+        with self._lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def get(self, range_name: str) -> List[List[Any]]:
+        """Read an open-ended range such as "B12:B" or "A2:X".
+
+        Like the API, trailing empty cells and rows are left out.
+        """
+        self._call("get")
+        start, end = range_name.split(":")
+        first_column = ord(start[0].upper()) - ord("A")
+        last_column = ord(end[0].upper()) - ord("A")
+        first_row = int(start[1:])
+        with self._lock:
+            if first_row > self.row_count:
+                raise _sheets_error(
+                    400,
+                    f"Range ('{self.title}'!{range_name}) exceeds grid limits. Max rows: {self.row_count}"
+                )
+            values = [row[first_column:last_column + 1] for row in self.rows[first_row - 1:]]
+
+        for row in values:
+            while row and row[-1] in ("", None):
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def find(self, query: str, in_column: Optional[int] = None):
+        self._call("find")
+        with self._lock:
+            for number, row in enumerate(self.rows, 1):
+                cells = [row[in_column - 1]] if in_column and len(row) >= in_column else row
+                if query in cells:
+                    return _FakeCell(number)
+        return None
+
+    def insert_row(self, values: List[Any], index: int = 1, **kwargs):
+        self._call("insert_row")
+        with self._lock:
+            self.rows.insert(index - 1, list(values))
+            self.row_count = max(self.row_count + 1, len(self.rows))
+
+    def update(self, range_name: str, values: List[List[Any]], **kwargs):
+        """Write rows starting at range_name (only "A1"-style starts)."""
+        self._call("update")
+        first_row = int("".join(c for c in range_name.split(":")[0] if c.isdigit()))
+        with self._lock:
+            for offset, values_row in enumerate(values):
+                self._set_row(first_row + offset, values_row)
+
+    def append_row(self, row: List[Any], **kwargs) -> Dict[str, Any]:
+        return self.append_rows([row], **kwargs)
+
+    def append_rows(self, rows: List[List[Any]], **kwargs) -> Dict[str, Any]:
+        self._call("append_rows")
+        with self._lock:
+            first = len(self.rows) + 1
+            self.rows.extend(list(row) for row in rows)
+            last = len(self.rows)
+            self.row_count = max(self.row_count, last)
+        return {"updates": {"updatedRange": f"{self.title}!A{first}:X{last}"}}
+
+    def batch_update(self, data: List[Dict[str, Any]], **kwargs):
+        self._call("batch_update")
+        with self._lock:
+            for update in data:
+                cell = update["range"]
+                column = ord(cell[0].upper()) - ord("A")
+                row_number = int(cell[1:])
+                while len(self.rows) < row_number:
+                    self.rows.append([])
+                self.row_count = max(self.row_count, row_number)
+                row = self.rows[row_number - 1]
+                row.extend([""] * (column + 1 - len(row)))
+                row[column] = update["values"][0][0]
+
+    def _set_row(self, row_number: int, values: List[Any]):
+        while len(self.rows) < row_number:
+            self.rows.append([])
+        self.row_count = max(self.row_count, row_number)
+        self.rows[row_number - 1] = list(values)
+
+
+class _FakeCell:
+    def __init__(self, row: int):
+        self.row = row
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet holding FakeWorksheets."""
+
+    def __init__(self, spreadsheet_id: str, conditions: FakeConditions):
+        self.id = spreadsheet_id
+        self.title = f"Fake spreadsheet {spreadsheet_id or ''}".strip()
+        self.conditions = conditions
+        self._worksheets: Dict[str, FakeWorksheet] = {}
+        # New Google spreadsheets start with an empty "Sheet1"
+        self.add_worksheet("Sheet1")
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, **kwargs) -> FakeWorksheet:
+        self._worksheets[title] = FakeWorksheet(title, self.conditions, row_count=rows)
+        return self._worksheets[title]
+
+
+class FakeSheetsBackend(SheetsBackend):
+    """In-process Google Sheets stand-in (no credentials needed).
+
+    Args:
+        conditions: Latency, error and quota settings for every call
+    """
+
+    requires_credentials_file = False
+
+    def __init__(self, conditions: Optional[FakeConditions] = None):
+        self.conditions = conditions or FakeConditions()
+        self.spreadsheet: Optional[FakeSpreadsheet] = None
+
+    def open(self, credentials_file: str, spreadsheet_id: str, scopes: List[str]) -> FakeSpreadsheet:
+        if self.spreadsheet is None:
+            self.spreadsheet = FakeSpreadsheet(spreadsheet_id, self.conditions)
+        return self.spreadsheet
+
+
+class FakeGmailClient:
+    """In-process Gmail stand-in with the GmailClient interface.
+
+    Messages are read and counted but not delivered.
+    """
+
+    def __init__(self, conditions: FakeConditions):
+        self.conditions = conditions
+        self.messages: deque = deque(maxlen=100)
+        self._sent = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+
+    def send(self, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        media = kwargs.get("media_body")
+        size = 0
+        if media is not None:
+            # Drain the upload like the real client would
+            stream = media.stream()
+            while True:
+                chunk = stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+        elif body:
+            size = len(body.get("raw", ""))
+
+        status = self.conditions.check("send")
+        if status:
+            with self._lock:
+                self._failed += 1
+            raise HttpError(
+                httplib2.Response({"status": status}),
+                json.dumps({"error": {"code": status, "message": "Fake Gmail error"}}).encode(),
+                uri="fake://gmail/users/me/messages/send"
+            )
+
+        message_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._sent += 1
+            self.messages.append({"id": message_id, "bytes": size})
+        return {"id": message_id}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sent": self._sent, "failed": self._failed, "backend": "fake"}
+
+    def close(self):
+        pass
+
+
+class FakeGmailBackend(GmailBackend):
+    """In-process Gmail stand-in (no credentials needed).
+
+    Args:
+        conditions: Latency, error and quota settings for every send
+    """
+
+    requires_credentials = False
+
+    def __init__(self, conditions: Optional[FakeConditions] = None):
+        self.conditions = conditions or FakeConditions()
+
+    def connect(self, client_id: str, client_secret: str, refresh_token: str, scopes: List[str]) -> FakeGmailClient:
+        return FakeGmailClient(self.conditions)
+
+
+def create_sheets_backend(name: str, **conditions) -> SheetsBackend:
+    """Return the Sheets backend for a setting value ("google" or "fake")."""
+    if name == "google":
+        return GoogleSheetsBackend()
+    if name == "fake":
+        return FakeSheetsBackend(FakeConditions(**conditions))
+    raise ValueError(f"Unknown Sheets backend: {name}")
+
+
+def create_gmail_backend(name: str, **conditions) -> GmailBackend:
+    """Return the Gmail backend for a setting value ("google" or "fake")."""
+    if name == "google":
+        return GoogleGmailBackend()
+    if name == "fake":
+        return FakeGmailBackend(FakeConditions(**conditions))
+    raise ValueError(f"Unknown Gmail backend: {name}")
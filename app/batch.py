@@ -0,0 +1,226 @@
+"""Batch contract generation across a process pool.
+
+Usage:
+    python -m app.batch records.json
+    python -m app.batch records.csv --workers 4 --report report.json
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from .config import settings
+from .logging_setup import setup_logging
+from .models import ContractFormData
+from .pdf_handler import PDFHandler
+
+
+# Handler owned by the current worker process (set by init_worker)
+_worker_handler: Optional[PDFHandler] = None
+
+
+def init_worker(template_path: str, save_profile: str = "fast",
+                fonts_folder: Optional[str] = None, log_level: Optional[str] = None,
+                log_format: str = "json"):
+    """Create the worker's PDF handler and parse the template once.
+
+    When `log_level` is given, the worker gets its own logging queue and
+    writer thread (the parent's listener thread does not exist in it).
+    """
+    global _worker_handler
+    if log_level:
+        setup_logging(log_level, log_format)
+    _worker_handler = PDFHandler(template_path, save_profile, fonts_folder)
+    _worker_handler.get_blank_template()
+
+
+def render_contract(data: Dict[str, str], output_path: str) -> str:
+    """Render a single contract to a file with the worker's handler."""
+    return _worker_handler.generate_pdf(data, output_path)
+
+
+def render_contract_bytes(data: Dict[str, str]) -> bytes:
+    """Render a single contract in memory with the worker's handler.
+
+    Used as the PDF stage function when rendering runs in a process pool.
+    """
+    return _worker_handler.render_pdf(data)
+
+
+def _render_record(index: int, data: Dict[str, str], output_path: str) -> Dict[str, Any]:
+    """Render a single contract inside a worker process."""
+    started = time.perf_counter()
+    try:
+        render_contract(data, output_path)
+        return {
+            "index": index,
+            "success": True,
+            "pdf_path": output_path,
+            "error": None,
+            "seconds": time.perf_counter() - started
+        }
+    except Exception as e:
+        return {
+            "index": index,
+            "success": False,
+            "pdf_path": None,
+            "error": str(e),
+            "seconds": time.perf_counter() - started
+        }
+
+
+def load_records(path: str) -> List[Dict[str, str]]:
+    """Load raw contract records from a JSON or CSV file.
+
+    Args:
+        path: JSON file holding a list of objects, or CSV file with a
+            header row using the form field names
+
+    Returns:
+        List of record dictionaries
+    """
+    file_path = Path(path)
+
+    if file_path.suffix.lower() == ".csv":
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            return [dict(row) for row in csv.DictReader(f)]
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    if not isinstance(records, list):
+        raise ValueError("JSON batch file must contain a list of records")
+
+    return records
+
+
+def generate_batch(
+    records: List[Dict[str, Any]],
+    output_folder: Optional[str] = None,
+    workers: Optional[int] = None,
+    template_path: Optional[str] = None,
+    save_profile: Optional[str] = None
+) -> Dict[str, Any]:
+    """Render many contracts in parallel.
+
+    Records are validated as ContractFormData before dispatch; invalid ones
+    are reported without being rendered.
+
+    Args:
+        records: Raw contract records
+        output_folder: Folder for generated PDFs (defaults to settings)
+        workers: Number of worker processes (defaults to settings, then CPU
+            count); never more than the CPU count or the number of records
+        template_path: Contract template (defaults to settings)
+        save_profile: PDF save profile, "fast" or "archival" (defaults to settings)
+
+    Returns:
+        Dictionary with per-record results, overall timings and the number
+        of worker processes actually used
+    """
+    output_folder = output_folder or settings.output_folder
+    template_path = template_path or settings.contract_pdf_path
+    save_profile = save_profile or settings.pdf_save_profile
+    cpu_count = os.cpu_count() or 1
+    workers = min(workers or settings.batch_workers or cpu_count, cpu_count)
+
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    results = []
+    jobs = []
+    for index, record in enumerate(records):
+        try:
+            form_data = ContractFormData(**record)
+        except ValidationError as e:
+            results.append({
+                "index": index,
+                "success": False,
+                "pdf_path": None,
+                "error": f"Invalid record: {e.error_count()} validation error(s)",
+                "seconds": 0.0
+            })
+            continue
+
+        output_filename = (
+            f"contract_{form_data.student_last_name}_{form_data.student_first_name}"
+            f"_{timestamp}_{index:04d}.pdf"
+        )
+        jobs.append((index, form_data.model_dump(), str(Path(output_folder) / output_filename)))
+
+    # Rendering is CPU bound: more processes than cores or jobs only add start-up cost
+    pool_size = min(workers, len(jobs))
+    started = time.perf_counter()
+
+    if jobs:
+        with ProcessPoolExecutor(
+            max_workers=pool_size,
+            initializer=init_worker,
+            initargs=(template_path, save_profile, settings.fonts_folder)
+        ) as executor:
+            futures = [executor.submit(_render_record, *job) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda result: result["index"])
+    succeeded = sum(1 for result in results if result["success"])
+
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "workers": pool_size,
+        "seconds": elapsed,
+        "contracts_per_second": succeeded / elapsed if elapsed > 0 else 0.0,
+        "results": results
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate contracts in batch from JSON or CSV records.")
+    parser.add_argument("records", help="JSON or CSV file with contract records")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--output", default=None, help="Output folder for generated PDFs")
+    parser.add_argument("--report", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--profile", choices=sorted(PDFHandler.SAVE_PROFILES), default=None,
+                        help="PDF save profile (fast or archival)")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.records)
+    report = generate_batch(
+        records,
+        output_folder=args.output,
+        workers=args.workers,
+        save_profile=args.profile
+    )
+
+    for result in report["results"]:
+        if result["success"]:
+            print(f"✅ #{result['index']}: {result['pdf_path']} ({result['seconds']:.2f}s)")
+        else:
+            print(f"❌ #{result['index']}: {result['error']}")
+
+    print(
+        f"\n📄 {report['succeeded']}/{report['total']} contracts in {report['seconds']:.2f}s "
+        f"with {report['workers']} workers ({report['contracts_per_second']:.1f}/s)"
+    )
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,10 +17,67 @@ class Settings(BaseSettings):
     # Google Sheets Configuration
     google_sheets_spreadsheet_id: str = ""
     google_sheets_credentials_file: str = "credentials/google_sheets_key.json"
+    sheets_flush_max_rows: int = 20
+    sheets_flush_interval: float = 2.0
+    sheets_spill_file: str = "data/sheets_spill.jsonl"
+    
+    # Backends: "google" for the real APIs, "fake" for in-memory stand-ins
+    # (load tests and benchmarks). Fake calls get the latency below, fail
+    # with HTTP 500 at fake_error_rate and with HTTP 429 above the quota
+    # (calls per minute, 0 = unlimited).
+    sheets_backend: str = "google"
+    gmail_backend: str = "google"
+    fake_sheets_latency: float = 0.0
+    fake_sheets_quota_per_minute: int = 0
+    fake_gmail_latency: float = 0.0
+    fake_gmail_quota_per_minute: int = 0
+    fake_error_rate: float = 0.0
+    
+    # Local mirror of the submissions sheet (reads go here, not to the API)
+    sheet_mirror_db_path: str = "data/sheet_mirror.db"
+    sheet_mirror_sync_interval: float = 30.0
+    
+    # Contract number allocation (sync interval: maximum mirror age)
+    contract_numbers_db_path: str = "data/contract_numbers.db"
+    contract_number_reservation_ttl: float = 900.0
+    contract_number_sync_interval: float = 60.0
     
     # Contract Configuration
     contract_pdf_path: str = "crm.eaea.ro Draft - Contract prestari servicii Early Alpha.docx (1).pdf"
     output_folder: str = "output"
+    pdf_save_profile: str = "fast"  # "fast" at intake, "archival" for storage
+    fonts_folder: str = "fonts"  # Template font files, e.g. PalatinoLinotype-Roman.ttf
+    archive_pdfs: bool = True  # Also archive each contract under output_folder (in the background)
+    archive_db_path: str = "data/archive.db"  # Index of archived contracts
+    
+    # Batch generation (0 = one worker per CPU core)
+    batch_workers: int = 0
+    
+    # Request path concurrency limits (per stage)
+    # PyMuPDF is not thread-safe: PDF rendering uses a single thread unless
+    # pdf_use_processes is enabled, in which case pdf_workers processes run.
+    pdf_workers: int = 1
+    pdf_use_processes: bool = False
+    sheets_workers: int = 4
+    email_workers: int = 2
+    
+    # Submission pipeline (render → persist → email)
+    pipeline_workers: int = 4
+    jobs_db_path: str = "data/jobs.db"
+    # Repeated submissions are answered from memory (each entry keeps its
+    # rendered PDF, ~350 KB, for re-sending)
+    submission_cache_size: int = 128
+    submission_cache_ttl: float = 3600.0
+    
+    # Outbound email queue (Gmail allows ~2.5 sends/s per user)
+    mail_queue_db_path: str = "data/mail_queue.db"
+    email_rate_per_second: float = 2.0
+    email_max_attempts: int = 6
+    email_retry_base_delay: float = 2.0
+    
+    # Logging ("json" for structured records, "text" for plain lines)
+    log_level: str = "INFO"
+    log_format: str = "json"
     
     # Application Configuration
     app_host: str = "0.0.0.0"
@@ -0,0 +1,201 @@
+"""Contract number allocation backed by a local counter."""
+import logging
+import secrets
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from .metrics import CONTRACT_NUMBER_SECONDS
+from .sheet_mirror import SheetMirror
+from .sqlite_store import SQLiteStore
+
+
+logger = logging.getLogger(__name__)
+
+def parse_contract_number(contract_no: str) -> Optional[Tuple[int, int]]:
+    """Split a contract number like "007/2025" into (7, 2025).
+
+    Returns:
+        (number, year) tuple, or None if the value is not a contract number
+    """
+    if not contract_no or '/' not in contract_no:
+        return None
+
+    try:
+        num_part, year_part = contract_no.split('/')
+        return int(num_part), int(year_part)
+    except (ValueError, IndexError):
+        return None
+
+
+class ContractNumberAllocator(SQLiteStore):
+    """Hand out contract numbers from an in-process per-year counter.
+
+    The highest number per year is kept in memory and in a small SQLite
+    database. Syncs read the contract numbers of rows added since the last
+    sync from the local sheet mirror, so reserving a number makes no API
+    call. Each call to `reserve` hands out a distinct number, held for
+    `reservation_ttl` seconds so concurrent users never see the same one.
+    The holder gets a reservation token with the number: only that token
+    can give the number back early (`release`), and it is passed to
+    `commit` when the contract is submitted.
+    """
+
+    def __init__(
+        self,
+        mirror: SheetMirror,
+        db_path: str,
+        reservation_ttl: float = 900.0,
+        sync_interval: float = 60.0
+    ):
+        """Open the counter database.
+
+        Args:
+            mirror: Local replica of the submissions sheet
+            db_path: Path to the SQLite counter database
+            reservation_ttl: Seconds a handed-out number stays reserved
+            sync_interval: Maximum age in seconds of the mirror when a
+                number is reserved (it normally syncs in the background)
+        """
+        super().__init__(db_path)
+        self.mirror = mirror
+        self.reservation_ttl = reservation_ttl
+        self.sync_interval = sync_interval
+
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS counters (
+                year INTEGER PRIMARY KEY,
+                max_used INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS reservations (
+                year INTEGER NOT NULL,
+                number INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                token TEXT,
+                PRIMARY KEY (year, number)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        # Databases created before reservation tokens
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reservations)")}
+        if "token" not in columns:
+            self._conn.execute("ALTER TABLE reservations ADD COLUMN token TEXT")
+        self._conn.commit()
+
+        self._max_used: Dict[int, int] = dict(self._conn.execute("SELECT year, max_used FROM counters"))
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'rows_seen'").fetchone()
+        self._rows_seen = row[0] if row else 0
+
+    @CONTRACT_NUMBER_SECONDS.time()
+    def reserve(self) -> Tuple[str, str]:
+        """Reserve the next contract number for the current year.
+
+        Returns:
+            (contract number in format XXX/YYYY, e.g. "001/2025",
+            reservation token)
+        """
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            # Local reads only, unless the mirror is older than sync_interval
+            self._sync()
+
+            year = datetime.now().year
+            now = time.time()
+            self._conn.execute("DELETE FROM reservations WHERE expires_at < ?", (now,))
+            reserved = {
+                number for (number,) in self._conn.execute(
+                    "SELECT number FROM reservations WHERE year = ?", (year,)
+                )
+            }
+
+            next_number = self._max_used.get(year, 0) + 1
+            while next_number in reserved:
+                next_number += 1
+
+            self._conn.execute(
+                "INSERT INTO reservations (year, number, expires_at, token) VALUES (?, ?, ?, ?)",
+                (year, next_number, now + self.reservation_ttl, token)
+            )
+            self._conn.commit()
+
+        return f"{next_number:03d}/{year}", token
+
+    def commit(self, contract_no: str, token: Optional[str] = None):
+        """Mark a contract number as used by a submitted contract.
+
+        Args:
+            contract_no: Submitted contract number
+            token: Reservation token the number was handed out with; its
+                reservation is dropped (others expire on their own)
+        """
+        parsed = parse_contract_number(contract_no)
+        if not parsed:
+            return
+
+        number, year = parsed
+        with self._lock:
+            self._observe(number, year)
+            if token:
+                self._conn.execute(
+                    "DELETE FROM reservations WHERE year = ? AND number = ? AND token = ?",
+                    (year, number, token)
+                )
+            self._conn.commit()
+
+    def release(self, token: str) -> bool:
+        """Give back a reserved number that will not be submitted.
+
+        Only the holder of the reservation token can release the number; it
+        is then handed out again by the next `reserve`.
+
+        Returns:
+            True if a reservation was released
+        """
+        with self._lock:
+            released = self._conn.execute("DELETE FROM reservations WHERE token = ?", (token,)).rowcount
+            self._conn.commit()
+        return released > 0
+
+    def sync(self):
+        """Read contract numbers from rows mirrored since the last sync."""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        """Incremental sync (caller holds the lock)."""
+
+        # Rows still in the write buffer are not in the sheet yet
+        for contract_no in self.mirror.sheets_service.buffer.pending_keys():
+            parsed = parse_contract_number(contract_no)
+            if parsed:
+                self._observe(*parsed)
+
+        # Reads the sheet only if the background sync has fallen behind
+        self.mirror.sync_if_stale(self.sync_interval)
+
+        # Only the contract numbers of rows we have not seen yet
+        for row_number, contract_no in self.mirror.contract_numbers(after_row=self._rows_seen):
+            parsed = parse_contract_number(contract_no)
+            if parsed:
+                self._observe(*parsed)
+
+        self._rows_seen = max(self._rows_seen, self.mirror.rows_seen)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('rows_seen', ?)",
+            (self._rows_seen,)
+        )
+        self._conn.commit()
+
+    def _observe(self, number: int, year: int):
+        """Raise the per-year maximum (caller holds the lock and commits)."""
+        if number > self._max_used.get(year, 0):
+            self._max_used[year] = number
+            self._conn.execute(
+                "INSERT OR REPLACE INTO counters (year, max_used) VALUES (?, ?)",
+                (year, number)
+            )
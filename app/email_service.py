@@ -1,15 +1,183 @@
 """Email service using Gmail API with OAuth2."""
 import base64
+import logging
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from email.message import EmailMessage
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+from email.policy import SMTP
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
 
+import httplib2
+import requests
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+
+from .backends import GmailBackend, GoogleGmailBackend
+from .metrics import GMAIL_SEND_FAILURES, GMAIL_SEND_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+# An attachment is a file path or an in-memory (filename, content) pair
+Attachment = Union[str, Tuple[str, bytes]]
+
+
+class GmailClient:
+    """Long-lived Gmail API client shared by all sends.
+    
+    The discovery client is built once from the static discovery document
+    bundled with google-api-python-client (no network fetch). The access
+    token is refreshed by a background thread shortly before it expires, so
+    sends never pay for a refresh, and each worker thread keeps its own
+    persistent HTTP connection that is reused across sends.
+    """
+    
+    TOKEN_URI = "https://oauth2.googleapis.com/token"
+    
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        refresh_token: str,
+        scopes: List[str],
+        refresh_margin: float = 300.0,
+        timeout: float = 30.0
+    ):
+        """Create credentials, fetch a first token and build the client.
+        
+        Args:
+            client_id: Gmail API client ID
+            client_secret: Gmail API client secret
+            refresh_token: OAuth2 refresh token
+            scopes: OAuth2 scopes
+            refresh_margin: Seconds before expiry at which the token is refreshed
+            timeout: HTTP timeout for Gmail API calls, in seconds
+        """
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.credentials = Credentials(
+            token=None,
+            refresh_token=refresh_token,
+            token_uri=self.TOKEN_URI,
+            client_id=client_id,
+            client_secret=client_secret,
+            scopes=scopes
+        )
+        
+        self._auth_request = Request(session=requests.Session())
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+        self._stopped = threading.Event()
+        
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._sent = 0
+        self._failed = 0
+        
+        self.refresh()
+        self.service = build(
+            'gmail',
+            'v1',
+            credentials=self.credentials,
+            static_discovery=True,
+            cache_discovery=False
+        )
+        
+        self._refresher = threading.Thread(target=self._refresh_loop, name="gmail-token-refresh", daemon=True)
+        self._refresher.start()
+    
+    def refresh(self):
+        """Refresh the access token."""
+        with self._refresh_lock:
+            self.credentials.refresh(self._auth_request)
+    
+    def send(self, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """Call users.messages.send and record its latency.
+        
+        Raises:
+            HttpError: If the Gmail API rejects the request
+        """
+        started = time.perf_counter()
+        try:
+            result = self.service.users().messages().send(
+                userId='me',
+                body=body,
+                **kwargs
+            ).execute(http=self._http())
+        except Exception:
+            with self._metrics_lock:
+                self._failed += 1
+            GMAIL_SEND_FAILURES.inc()
+            raise
+        
+        elapsed = time.perf_counter() - started
+        with self._metrics_lock:
+            self._sent += 1
+            self._latencies.append(elapsed)
+        GMAIL_SEND_SECONDS.observe(elapsed)
+        
+        return result
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return send counters and latency percentiles (seconds)."""
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            metrics = {
+                "sent": self._sent,
+                "failed": self._failed,
+                "token_expiry": self.credentials.expiry.isoformat() if self.credentials.expiry else None
+            }
+        
+        if latencies:
+            metrics["latency_avg"] = statistics.fmean(latencies)
+            metrics["latency_p50"] = latencies[int(0.50 * (len(latencies) - 1))]
+            metrics["latency_p95"] = latencies[int(0.95 * (len(latencies) - 1))]
+            metrics["latency_max"] = latencies[-1]
+        
+        return metrics
+    
+    def close(self):
+        """Stop the background token refresh."""
+        self._stopped.set()
+    
+    def _http(self) -> AuthorizedHttp:
+        """Return this thread's persistent authorized HTTP transport."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            # httplib2 connections are not thread-safe, so one per thread
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+            self._local.http = http
+        return http
+    
+    def _refresh_loop(self):
+        while not self._stopped.is_set():
+            expiry = self.credentials.expiry
+            if expiry is None:
+                wait = 60.0
+            else:
+                # Credentials.expiry is a naive UTC datetime
+                wait = (expiry - datetime.utcnow()).total_seconds() - self.refresh_margin
+            
+            if self._stopped.wait(max(wait, 1.0)):
+                return
+            
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing Gmail token: %s", e)
+                self._stopped.wait(30.0)
 
 
 class EmailService:
@@ -17,44 +185,127 @@ class EmailService:
     
     SCOPES = ['https://www.googleapis.com/auth/gmail.send']
     
-    def __init__(self, client_id: str, client_secret: str, refresh_token: str):
+    # Messages are assembled in memory up to this size, then on disk
+    SPOOL_MAX_SIZE = 1024 * 1024
+    # Messages above this size use a resumable upload in chunks
+    RESUMABLE_THRESHOLD = 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # Must be a multiple of 256 KB
+    # Raw bytes per base64 chunk; a multiple of 57 gives whole 76-char lines
+    ENCODE_CHUNK_SIZE = 57 * 1024
+    
+    def __init__(self, client_id: str, client_secret: str, refresh_token: str,
+                 backend: Optional[GmailBackend] = None):
         """Initialize email service with OAuth2 credentials.
         
         Args:
             client_id: Gmail API client ID
             client_secret: Gmail API client secret
             refresh_token: OAuth2 refresh token
+            backend: Gmail backend (defaults to the Gmail API)
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.refresh_token = refresh_token
-        self.service = None
+        self.backend = backend or GoogleGmailBackend()
+        self.client: Optional[GmailClient] = None
         
-        if client_id and client_secret and refresh_token:
+        if not self.backend.requires_credentials or (client_id and client_secret and refresh_token):
             self._authenticate()
     
     def _authenticate(self):
         """Authenticate with Gmail API using OAuth2."""
         try:
-            # Create credentials from refresh token
-            credentials = Credentials(
-                token=None,
-                refresh_token=self.refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                scopes=self.SCOPES
+            self.client = self.backend.connect(
+                self.client_id,
+                self.client_secret,
+                self.refresh_token,
+                self.SCOPES
             )
+        except Exception as e:
+            logger.error("Error authenticating with Gmail API: %s", e)
+            self.client = None
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return Gmail send metrics (empty if not authenticated)."""
+        return self.client.get_metrics() if self.client else {}
+    
+    def close(self):
+        """Release the Gmail client."""
+        if self.client:
+            self.client.close()
+    
+    @staticmethod
+    def _header_bytes(message: EmailMessage) -> bytes:
+        """Serialize only the headers of a message, plus the blank line."""
+        return b"".join(SMTP.fold_binary(name, value) for name, value in message.items()) + b"\r\n"
+    
+    def _write_message(
+        self,
+        out: BinaryIO,
+        to_email: str,
+        subject: str,
+        body_html: str,
+        body_text: str = "",
+        cc_emails: Optional[List[str]] = None,
+        attachments: Optional[List[Attachment]] = None
+    ):
+        """Write a multipart/mixed MIME message to a binary file.
+        
+        Only the text parts are built in memory; each attachment is read
+        (or sliced, for in-memory content) and base64-encoded chunk by
+        chunk, so no extra copy of the attachment is made.
+        """
+        boundary = f"=_{uuid.uuid4().hex}"
+        
+        headers = EmailMessage(policy=SMTP)
+        headers['MIME-Version'] = '1.0'
+        headers['To'] = to_email
+        if cc_emails:
+            headers['Cc'] = ', '.join(cc_emails)
+        headers['Subject'] = subject
+        headers['Content-Type'] = f'multipart/mixed; boundary="{boundary}"'
+        out.write(self._header_bytes(headers))
+        
+        # Text and HTML alternatives
+        body = MIMEMultipart('alternative')
+        if body_text:
+            body.attach(MIMEText(body_text, 'plain', 'utf-8'))
+        body.attach(MIMEText(body_html, 'html', 'utf-8'))
+        del body['MIME-Version']
+        out.write(f"--{boundary}\r\n".encode())
+        out.write(body.as_bytes(policy=SMTP))
+        out.write(b"\r\n")
+        
+        for attachment in attachments or []:
+            if isinstance(attachment, tuple):
+                filename, content = attachment
+            elif Path(attachment).exists():
+                filename, content = Path(attachment).name, None
+            else:
+                continue
             
-            # Refresh the token
-            credentials.refresh(Request())
+            part = EmailMessage(policy=SMTP)
+            part['Content-Type'] = 'application/octet-stream'
+            part['Content-Transfer-Encoding'] = 'base64'
+            part.add_header('Content-Disposition', 'attachment', filename=filename)
+            out.write(f"--{boundary}\r\n".encode())
+            out.write(self._header_bytes(part))
             
-            # Build the Gmail service
-            self.service = build('gmail', 'v1', credentials=credentials)
+            if content is not None:
+                view = memoryview(content)
+                for offset in range(0, len(view), self.ENCODE_CHUNK_SIZE):
+                    chunk = view[offset:offset + self.ENCODE_CHUNK_SIZE]
+                    out.write(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+                continue
             
-        except Exception as e:
-            print(f"Error authenticating with Gmail API: {e}")
-            self.service = None
+            with open(attachment, 'rb') as f:
+                while True:
+                    chunk = f.read(self.ENCODE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+        
+        out.write(f"--{boundary}--\r\n".encode())
     
     def send_email(
         self,
@@ -63,7 +314,8 @@ class EmailService:
         body_html: str,
         body_text: str = "",
         cc_emails: Optional[List[str]] = None,
-        attachments: Optional[List[str]] = None
+        attachments: Optional[List[Attachment]] = None,
+        raise_errors: bool = False
     ) -> bool:
         """Send an email with optional attachments.
         
@@ -73,64 +325,56 @@ class EmailService:
             body_html: HTML body content
             body_text: Plain text body content (fallback)
             cc_emails: List of CC email addresses
-            attachments: List of file paths to attach
+            attachments: File paths or (filename, content) pairs to attach
+            raise_errors: Re-raise send errors instead of returning False
+                (used by the mail queue to decide on retries)
             
         Returns:
             True if email sent successfully, False otherwise
         """
-        if not self.service:
-            print("Error: Email service not authenticated")
+        if not self.client:
+            logger.error("Email service not authenticated")
             return False
         
         try:
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['To'] = to_email
-            message['Subject'] = subject
-            
-            if cc_emails:
-                message['Cc'] = ', '.join(cc_emails)
+            # Assemble the MIME message in a spooled file; attachments are
+            # base64-encoded in chunks instead of being read whole
+            with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE) as message_file:
+                self._write_message(
+                    message_file,
+                    to_email=to_email,
+                    subject=subject,
+                    body_html=body_html,
+                    body_text=body_text,
+                    cc_emails=cc_emails,
+                    attachments=attachments
+                )
+                
+                # Upload as message/rfc822 media; large messages go in chunks
+                message_size = message_file.tell()
+                message_file.seek(0)
+                media = MediaIoBaseUpload(
+                    message_file,
+                    mimetype='message/rfc822',
+                    chunksize=self.UPLOAD_CHUNK_SIZE,
+                    resumable=message_size > self.RESUMABLE_THRESHOLD
+                )
+                
+                # Send message
+                send_message = self.client.send(media_body=media)
             
-            # Add text and HTML parts
-            if body_text:
-                part_text = MIMEText(body_text, 'plain', 'utf-8')
-                message.attach(part_text)
-            
-            part_html = MIMEText(body_html, 'html', 'utf-8')
-            message.attach(part_html)
-            
-            # Add attachments
-            if attachments:
-                for file_path in attachments:
-                    if Path(file_path).exists():
-                        with open(file_path, 'rb') as f:
-                            file_data = f.read()
-                        
-                        attachment = MIMEApplication(file_data)
-                        attachment.add_header(
-                            'Content-Disposition',
-                            'attachment',
-                            filename=Path(file_path).name
-                        )
-                        message.attach(attachment)
-            
-            # Encode message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
-            # Send message
-            send_message = self.service.users().messages().send(
-                userId='me',
-                body={'raw': raw_message}
-            ).execute()
-            
-            print(f"Email sent successfully. Message ID: {send_message['id']}")
+            logger.info("Email sent", extra={"message_id": send_message['id'], "bytes": message_size})
             return True
             
         except HttpError as error:
-            print(f"An error occurred sending email: {error}")
+            logger.error("An error occurred sending email: %s", error)
+            if raise_errors:
+                raise
             return False
         except Exception as e:
-            print(f"Unexpected error sending email: {e}")
+            logger.exception("Unexpected error sending email: %s", e)
+            if raise_errors:
+                raise
             return False
     
     def send_contract_email(
@@ -138,8 +382,10 @@ class EmailService:
         client_email: str,
         client_name: str,
         student_name: str,
-        contract_pdf_path: str,
-        admin_email: str
+        contract_pdf_path: Optional[str],
+        admin_email: str,
+        raise_errors: bool = False,
+        contract_pdf: Optional[bytes] = None
     ) -> bool:
         """Send contract email to client and admin.
         
@@ -147,8 +393,12 @@ class EmailService:
             client_email: Client's email address
             client_name: Client's full name
             student_name: Student's full name
-            contract_pdf_path: Path to generated contract PDF
+            contract_pdf_path: Path to generated contract PDF; with
+                `contract_pdf`, only its file name is used
             admin_email: Admin email for CC
+            raise_errors: Re-raise send errors instead of returning False
+            contract_pdf: Contract PDF content, attached without reading
+                the file
             
         Returns:
             True if email sent successfully
@@ -252,6 +502,17 @@ class EmailService:
             body_html=body_html,
             body_text=body_text,
             cc_emails=[admin_email] if admin_email else None,
-            attachments=[contract_pdf_path] if Path(contract_pdf_path).exists() else None
+            attachments=self._contract_attachments(contract_pdf_path, contract_pdf),
+            raise_errors=raise_errors
         )
-
+    
+    @staticmethod
+    def _contract_attachments(contract_pdf_path: Optional[str],
+                              contract_pdf: Optional[bytes]) -> Optional[List[Attachment]]:
+        """Attach the contract from memory when available, else from disk."""
+        if contract_pdf is not None:
+            filename = Path(contract_pdf_path).name if contract_pdf_path else "contract.pdf"
+            return [(filename, contract_pdf)]
+        if contract_pdf_path and Path(contract_pdf_path).exists():
+            return [contract_pdf_path]
+        return None
@@ -0,0 +1,65 @@
+"""Bounded executors for blocking work in the request path."""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class StageExecutor:
+    """Run one blocking stage (PDF, Sheets, Gmail) off the event loop.
+
+    Each stage gets its own pool, so a slow Google API call can only tie up
+    the workers of its own stage while the event loop keeps serving requests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        use_processes: bool = False,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = ()
+    ):
+        """Create the stage pool.
+
+        Args:
+            name: Stage name, used for worker thread names
+            max_workers: Maximum number of concurrent calls for this stage
+            use_processes: Use a process pool instead of threads
+            initializer: Optional callable run once in each worker
+            initargs: Arguments for the initializer
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.use_processes = use_processes
+
+        if use_processes:
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=initializer,
+                initargs=initargs
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=f"{name}-stage",
+                initializer=initializer,
+                initargs=initargs
+            )
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the stage pool and await its result.
+
+        Thread workers run in a copy of the caller's context, so log records
+        keep the caller's correlation ID.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if not self.use_processes:
+            call = functools.partial(contextvars.copy_context().run, call)
+        return await loop.run_in_executor(self._executor, call)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the stage pool."""
+        self._executor.shutdown(wait=wait)
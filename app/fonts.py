@@ -0,0 +1,130 @@
+"""Font loading and caching for text written into contracts."""
+import fitz  # PyMuPDF
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Base-14 fonts used when a template font file is not available
+BASE14_FALLBACKS = {
+    'PalatinoLinotype-Roman': 'tiro',  # Times-Roman
+    'PalatinoLinotype-Bold': 'tibo',  # Times-Bold
+    'PalatinoLinotype-Italic': 'tiit',  # Times-Italic
+    'PalatinoLinotype-BoldItalic': 'tibi',  # Times-BoldItalic
+    'OpenSans-Regular': 'helv',  # Helvetica
+    'OpenSans-Bold': 'hebo',  # Helvetica-Bold
+}
+
+
+# Baseline-to-baseline distance as a multiple of the font size (the
+# ascender-descender span, ~1.39 for Times, leaves too little room in the
+# fitted boxes)
+LINE_SPACING = 1.15
+
+
+class GlyphWidths:
+    """Advance-width table for one font.
+
+    Widths are stored at unit font size and filled on first use of each
+    character; advances scale linearly with size, so measuring a string at
+    any size is one dictionary lookup per character.
+    """
+
+    def __init__(self, font: fitz.Font):
+        self.font = font
+        self._widths: Dict[str, float] = {}
+
+    def text_width(self, text: str, fontsize: float) -> float:
+        """Width of `text` in points at `fontsize`."""
+        widths = self._widths
+        total = 0.0
+        for char in text:
+            width = widths.get(char)
+            if width is None:
+                width = widths[char] = self.font.glyph_advance(ord(char))
+            total += width
+        return total * fontsize
+
+    def line_height(self, fontsize: float) -> float:
+        """Distance between baselines of consecutive lines at `fontsize`."""
+        return fontsize * LINE_SPACING
+
+
+class FontCache:
+    """Process-wide cache of the real template fonts.
+
+    Font files are looked up in the fonts folder by the template font name
+    (e.g. `fonts/PalatinoLinotype-Roman.ttf`). Each file is parsed once per
+    process and the `fitz.Font` object is reused for every contract.
+    """
+
+    FONT_EXTENSIONS = ('.ttf', '.otf')
+
+    # One cache per fonts folder, shared by all PDF handlers
+    _instances: Dict[str, "FontCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, fonts_folder: Optional[str]):
+        self.fonts_folder = Path(fonts_folder) if fonts_folder else None
+        self._fonts: Dict[str, Optional[fitz.Font]] = {}
+        self._metrics: Dict[str, GlyphWidths] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, fonts_folder: Optional[str]) -> "FontCache":
+        """Return the process-wide cache for a fonts folder."""
+        key = str(fonts_folder or "")
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(fonts_folder)
+            return cls._instances[key]
+
+    @staticmethod
+    def base_name(fontname: str) -> str:
+        """Strip the subset prefix from a font name ("BAAAAA+Name" → "Name")."""
+        return fontname.split('+', 1)[-1]
+
+    def get(self, fontname: str) -> Optional[fitz.Font]:
+        """Return the loaded font for a template font name, or None."""
+        name = self.base_name(fontname)
+        if name not in self._fonts:
+            with self._lock:
+                if name not in self._fonts:
+                    self._fonts[name] = self._load(name)
+        return self._fonts[name]
+
+    def fallback(self, fontname: str) -> str:
+        """Return the base-14 font closest to a template font."""
+        return BASE14_FALLBACKS.get(self.base_name(fontname), 'tiro')
+
+    def metrics(self, fontname: str) -> GlyphWidths:
+        """Return the glyph-width table for the font text is written in.
+
+        This is the real template font when available, otherwise its
+        base-14 fallback.
+        """
+        name = self.base_name(fontname)
+        metrics = self._metrics.get(name)
+        if metrics is None:
+            font = self.get(name) or fitz.Font(self.fallback(name))
+            with self._lock:
+                metrics = self._metrics.setdefault(name, GlyphWidths(font))
+        return metrics
+
+    def _load(self, name: str) -> Optional[fitz.Font]:
+        if not self.fonts_folder:
+            return None
+
+        for extension in self.FONT_EXTENSIONS:
+            font_path = self.fonts_folder / f"{name}{extension}"
+            if font_path.exists():
+                try:
+                    return fitz.Font(fontfile=str(font_path))
+                except Exception as e:
+                    logger.warning("Could not load font %s: %s", font_path, e)
+                    return None
+
+        return None
@@ -0,0 +1,117 @@
+"""Deduplication of repeated submissions."""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class IdempotencyKeyConflict(Exception):
+    """An idempotency key was reused for a different submission."""
+
+
+def canonical_hash(data: Dict[str, Any]) -> str:
+    """Return a SHA-256 of form data that ignores key order."""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe mapping with a per-entry TTL and LRU eviction.
+
+    Expired entries are dropped when read; when the cache is full the
+    least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600.0):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries kept
+            ttl: Seconds an entry stays valid after it was stored
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value stored under key, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SubmissionCache:
+    """Map submissions to the job that processes them.
+
+    Submissions are identified by the canonical hash of their form data,
+    so a double-click or browser retry finds the job of the first attempt
+    instead of rendering, logging and emailing the contract again. Clients
+    may also send an idempotency key; a key reused with different data is
+    rejected. The rendered PDF is kept with the entry so re-sending the
+    contract does not render it again.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600.0):
+        """Create an empty cache.
+
+        Args:
+            max_entries: Maximum number of submissions remembered
+            ttl: Seconds a submission is remembered
+        """
+        self._submissions = TTLCache(max_entries, ttl)
+        self._keys = TTLCache(max_entries, ttl)
+
+    def lookup(self, data_hash: str, idempotency_key: Optional[str] = None) -> Optional[str]:
+        """Return the job ID of an earlier identical submission, or None.
+
+        Raises:
+            IdempotencyKeyConflict: If the key was used for other data
+        """
+        if idempotency_key:
+            known_hash = self._keys.get(idempotency_key)
+            if known_hash is not None and known_hash != data_hash:
+                raise IdempotencyKeyConflict("Idempotency key was already used for a different submission")
+
+        entry = self._submissions.get(data_hash)
+        return entry["job_id"] if entry else None
+
+    def remember(self, data_hash: str, job_id: str, idempotency_key: Optional[str] = None):
+        """Record the job processing a submission."""
+        self._submissions.set(data_hash, {"job_id": job_id, "pdf": None})
+        if idempotency_key:
+            self._keys.set(idempotency_key, data_hash)
+
+    def store_pdf(self, data_hash: str, job_id: str, pdf_bytes: bytes):
+        """Keep the rendered PDF of a remembered submission."""
+        entry = self._submissions.get(data_hash)
+        if entry is not None and entry["job_id"] == job_id:
+            entry["pdf"] = pdf_bytes
+
+    def get_pdf(self, data_hash: str) -> Optional[bytes]:
+        """Return the cached PDF of a submission, or None."""
+        entry = self._submissions.get(data_hash)
+        return entry["pdf"] if entry else None
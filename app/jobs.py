@@ -0,0 +1,216 @@
+"""Durable submission jobs and the staged processing pipeline."""
+import asyncio
+import json
+import logging
+import sqlite3
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .logging_setup import correlation_id
+from .metrics import JOB_RETRIES, STAGE_FAILURES
+from .sqlite_store import SQLiteStore
+
+
+logger = logging.getLogger(__name__)
+
+class JobStore(SQLiteStore):
+    """SQLite journal of submission jobs, so queued work survives restarts."""
+
+    def __init__(self, db_path: str):
+        """Open (or create) the job database.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        super().__init__(db_path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT NOT NULL DEFAULT '{}',
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._conn.commit()
+
+    def create(self, payload: Dict[str, Any], stage: str) -> str:
+        """Insert a new queued job and return its ID."""
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, payload, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, stage, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job as a dictionary, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        """Update job columns; 'result' and 'payload' are JSON-encoded."""
+        for key in ("result", "payload"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key], ensure_ascii=False)
+        fields["updated_at"] = datetime.now().isoformat(timespec="seconds")
+
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def unfinished(self) -> List[str]:
+        """Return IDs of jobs that were queued or running, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"])
+        return job
+
+
+# A stage receives the job dict and returns values to merge into its result
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class SubmissionPipeline:
+    """Run submissions through ordered stages (render → persist → email).
+
+    Progress is journaled after every stage. Jobs left unfinished by a
+    restart resume at the stage they were in, and failed jobs can be
+    retried from the stage that failed.
+    """
+
+    def __init__(self, store: JobStore, stages: Dict[str, StageFunc], workers: int = 2):
+        """Create the pipeline.
+
+        Args:
+            store: Job journal
+            stages: Ordered mapping of stage name to async stage function
+            workers: Number of jobs processed concurrently
+        """
+        self.store = store
+        self.stages = stages
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def first_stage(self) -> str:
+        return next(iter(self.stages))
+
+    async def start(self):
+        """Start workers and re-queue jobs left unfinished by a restart."""
+        self._queue = asyncio.Queue()
+        for job_id in self.store.unfinished():
+            self._queue.put_nowait(job_id)
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop workers; in-flight jobs stay journaled and resume on restart."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: Dict[str, Any]) -> str:
+        """Journal a new job and queue it for processing.
+
+        The current correlation ID is stored with the payload so the job's
+        log records can be tied back to the submitting request.
+
+        Returns:
+            The job ID
+        """
+        payload = {**payload, "correlation_id": correlation_id.get()}
+        job_id = self.store.create(payload, self.first_stage)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def retry(self, job_id: str) -> bool:
+        """Re-queue a failed job from the stage that failed.
+
+        Returns:
+            True if the job was re-queued
+        """
+        job = self.store.get(job_id)
+        if not job or job["status"] != "failed":
+            return False
+
+        self.store.update(job_id, status="queued", error=None)
+        self._queue.put_nowait(job_id)
+        JOB_RETRIES.inc()
+        return True
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str):
+        job = self.store.get(job_id)
+        if not job or job["status"] in ("completed", "failed"):
+            return
+
+        stage_names = list(self.stages)
+        if job["stage"] not in self.stages:
+            self.store.update(job_id, status="completed", stage="done", error=None)
+            return
+
+        # Log under the correlation ID of the request that submitted the job
+        correlation_id.set(job["payload"].get("correlation_id") or job_id)
+
+        # Values stages hand to later stages without journaling them
+        # (e.g. the rendered PDF); lost on restart, so stages must be able
+        # to recreate them
+        job["artifacts"] = {}
+
+        start = stage_names.index(job["stage"])
+        self.store.update(job_id, status="running", attempts=job["attempts"] + 1)
+
+        for position, stage in enumerate(stage_names[start:], start):
+            try:
+                job["result"].update(await self.stages[stage](job))
+            except Exception as e:
+                STAGE_FAILURES.labels(stage).inc()
+                logger.exception("Error in %s stage of job %s: %s", stage, job_id, e,
+                                 extra={"job_id": job_id, "stage": stage})
+                self.store.update(job_id, status="failed", error=str(e), result=job["result"])
+                return
+
+            # Journal the next stage so a restart resumes after this one
+            next_stage = stage_names[position + 1] if position + 1 < len(stage_names) else "done"
+            self.store.update(job_id, stage=next_stage, result=job["result"])
+
+        self.store.update(job_id, status="completed", error=None)
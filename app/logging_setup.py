@@ -0,0 +1,120 @@
+"""Structured logging with non-blocking output and correlation IDs."""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+
+# Correlation ID of the request (or job) the current code runs for
+correlation_id: contextvars.ContextVar[str] = contextvars.ContextVar("correlation_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "correlation_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_correlation_id() -> str:
+    """Return a fresh correlation ID."""
+    return uuid.uuid4().hex[:16]
+
+
+def set_correlation_id(value: Optional[str] = None) -> contextvars.Token:
+    """Set the current correlation ID (a new one if not given).
+
+    Returns:
+        Token for `correlation_id.reset`
+    """
+    return correlation_id.set(value or new_correlation_id())
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp records with the correlation ID of the emitting context.
+
+    Attached to the queue handler, so it runs in the thread that logs and
+    not in the listener thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+        }
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = "INFO", log_format: str = "json") -> logging.handlers.QueueListener:
+    """Route all logging through a queue to a background writer thread.
+
+    Callers only put records on an in-memory queue; formatting and the
+    write to stdout happen on the listener thread. Calling this again
+    replaces the previous configuration.
+
+    Args:
+        level: Root log level name (DEBUG, INFO, WARNING, ...)
+        log_format: "json" for structured records, "text" for plain lines
+
+    Returns:
+        The running queue listener
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s"
+        )
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def _stop_listener():
+    """Flush queued records on interpreter exit."""
+    if _listener is not None:
+        _listener.stop()
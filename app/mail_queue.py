@@ -0,0 +1,268 @@
+"""Persistent outbound email queue with retrying sender workers."""
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from .email_service import EmailService
+from .metrics import EMAIL_FAILURES, EMAIL_RETRIES
+from .sqlite_store import SQLiteStore
+
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying (rate limits and server errors)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Token bucket shared by all sender workers."""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a send is allowed."""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class MailQueue(SQLiteStore):
+    """Queue contract emails in SQLite and send them from worker threads.
+
+    Sends that fail with 429/5xx or a network error are retried with
+    exponential backoff; other API errors fail immediately. The final
+    outcome is reported through `on_status(contract_no, status)`, which the
+    app uses to write the sheet's "Email Sent" column in batches.
+    """
+
+    def __init__(
+        self,
+        email_service: EmailService,
+        db_path: str,
+        workers: int = 2,
+        rate_per_second: float = 2.0,
+        max_attempts: int = 6,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        on_status: Optional[Callable[[str, str], None]] = None
+    ):
+        """Open the queue database.
+
+        Args:
+            email_service: Service used to send the emails
+            db_path: Path to the SQLite queue database
+            workers: Number of concurrent sender threads
+            rate_per_second: Maximum sends per second across all workers
+            max_attempts: Attempts before a message is marked failed
+            base_delay: First retry delay in seconds (doubles per attempt)
+            max_delay: Upper bound for the retry delay in seconds
+            on_status: Callback receiving (contract_no, "Sent" | "Failed")
+        """
+        super().__init__(db_path)
+        self.email_service = email_service
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_status = on_status
+        self.rate_limiter = RateLimiter(rate_per_second)
+
+        self._wake = threading.Condition(self._lock)
+        self._stopped = False
+        self._threads: List[threading.Thread] = []
+
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mails (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contract_no TEXT,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS mails_due ON mails (status, next_attempt_at)")
+        # Contract PDF content, kept until the message is sent
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(mails)")}
+        if "attachment" not in columns:
+            self._conn.execute("ALTER TABLE mails ADD COLUMN attachment BLOB")
+        # Sends interrupted by a crash are retried
+        self._conn.execute("UPDATE mails SET status = 'queued' WHERE status = 'sending'")
+        self._conn.commit()
+
+    def start(self):
+        """Start the sender workers."""
+        self._stopped = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"mail-sender-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the workers; unsent messages stay queued for the next start."""
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def close(self):
+        """Stop the workers and close the database."""
+        self.stop()
+        super().close()
+
+    def enqueue_contract_email(self, contract_no: str, contract_pdf: Optional[bytes] = None, **params) -> int:
+        """Queue a contract email.
+
+        Args:
+            contract_no: Contract number, used to report the status back
+            contract_pdf: Contract PDF content, stored with the message so
+                sending does not depend on the file on disk
+            **params: Keyword arguments for EmailService.send_contract_email
+
+        Returns:
+            The queued message ID
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._wake:
+            cursor = self._conn.execute(
+                "INSERT INTO mails (contract_no, params, attachment, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (contract_no, json.dumps(params, ensure_ascii=False), contract_pdf, time.time(), now, now)
+            )
+            self._conn.commit()
+            self._wake.notify()
+        return cursor.lastrowid
+
+    def get(self, mail_id: int) -> Optional[Dict[str, Any]]:
+        """Return a queued message's status fields, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, contract_no, status, attempts, last_error, updated_at FROM mails WHERE id = ?",
+                (mail_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def depth(self) -> int:
+        """Number of messages waiting to be sent."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM mails WHERE status IN ('queued', 'sending')"
+            ).fetchone()[0]
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Take the next due message, waiting until one is due (or stop)."""
+        with self._wake:
+            while not self._stopped:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT * FROM mails WHERE status = 'queued' ORDER BY next_attempt_at LIMIT 1"
+                ).fetchone()
+
+                if row is not None and row["next_attempt_at"] <= now:
+                    self._conn.execute(
+                        "UPDATE mails SET status = 'sending', attempts = attempts + 1 WHERE id = ?",
+                        (row["id"],)
+                    )
+                    self._conn.commit()
+                    return row
+
+                timeout = row["next_attempt_at"] - now if row is not None else None
+                self._wake.wait(timeout=timeout)
+        return None
+
+    def _worker(self):
+        while True:
+            row = self._claim()
+            if row is None:
+                return
+
+            self.rate_limiter.acquire()
+            attempts = row["attempts"] + 1
+
+            try:
+                params = json.loads(row["params"])
+                if row["attachment"] is not None:
+                    params["contract_pdf"] = row["attachment"]
+                sent = self.email_service.send_contract_email(**params, raise_errors=True)
+                error = None if sent else "Email service not authenticated"
+                retryable = True
+            except HttpError as e:
+                sent = False
+                error = str(e)
+                retryable = e.resp.status in RETRYABLE_STATUSES
+            except Exception as e:
+                sent = False
+                error = str(e)
+                retryable = True
+
+            if sent:
+                self._finish(row, "sent", None, "Sent")
+            elif retryable and attempts < self.max_attempts:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                delay *= random.uniform(0.8, 1.2)
+                EMAIL_RETRIES.inc()
+                logger.warning(
+                    "Email %s failed (attempt %d), retrying in %.0fs: %s", row['id'], attempts, delay, error,
+                    extra={"mail_id": row['id'], "contract_no": row['contract_no']}
+                )
+                with self._wake:
+                    self._conn.execute(
+                        "UPDATE mails SET status = 'queued', next_attempt_at = ?, last_error = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (time.time() + delay, error, datetime.now().isoformat(timespec="seconds"), row["id"])
+                    )
+                    self._conn.commit()
+                    self._wake.notify()
+            else:
+                EMAIL_FAILURES.inc()
+                logger.error(
+                    "Email %s failed permanently: %s", row['id'], error,
+                    extra={"mail_id": row['id'], "contract_no": row['contract_no']}
+                )
+                self._finish(row, "failed", error, "Failed")
+
+    def _finish(self, row: sqlite3.Row, status: str, error: Optional[str], sheet_status: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE mails SET status = ?, last_error = ?, updated_at = ?, "
+                "attachment = CASE WHEN ? = 'sent' THEN NULL ELSE attachment END WHERE id = ?",
+                (status, error, datetime.now().isoformat(timespec="seconds"), status, row["id"])
+            )
+            self._conn.commit()
+
+        if self.on_status and row["contract_no"]:
+            try:
+                self.on_status(row["contract_no"], sheet_status)
+            except Exception as e:
+                logger.error("Error reporting email status: %s", e, extra={"contract_no": row["contract_no"]})
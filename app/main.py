@@ -1,72 +1,339 @@
 """FastAPI application for contract automation."""
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, Form, Header, HTTPException
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from fastapi.templating import Jinja2Templates
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
+from urllib.parse import quote
 import json
+import logging
+import unicodedata
 
 from .config import settings
 from .models import ContractFormData
 from .pdf_handler import PDFHandler
 from .email_service import EmailService
 from .sheets_service import SheetsService
+from .backends import create_gmail_backend, create_sheets_backend
+from .executors import StageExecutor
+from .services import ServiceRegistry
+from .jobs import JobStore, SubmissionPipeline
+from .contract_numbers import ContractNumberAllocator
+from .sheet_mirror import SheetMirror
+from .mail_queue import MailQueue
+from .archive import ContractArchive, contract_digest, contract_filename
+from .idempotency import IdempotencyKeyConflict, SubmissionCache, canonical_hash
+from .static_assets import REVALIDATE_CACHE_CONTROL, CachedAsset, FingerprintedStaticFiles
+from .metrics import MAIL_QUEUE_DEPTH, PIPELINE_QUEUE_DEPTH, SHEETS_BUFFER_DEPTH, render_latest
+from .logging_setup import correlation_id, set_correlation_id, setup_logging
+from . import batch
+
+
+# Structured logs go through a queue to a background writer thread
+setup_logging(settings.log_level, settings.log_format)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Accept traffic immediately; build services in the background."""
+    form_page()
+    services.start_warmup()
+    mail_queue.start()
+    await pipeline.start()
+    
+    yield
+    
+    await pipeline.stop()
+    for executor in (pdf_executor, sheets_executor):
+        executor.shutdown(wait=False)
+    # Let pending archive writes finish
+    archive_executor.shutdown(wait=True)
+    contract_archive.close()
+    mail_queue.close()
+    services.close()
+    job_store.close()
 
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Contract Automation System",
     description="Automated contract generation and management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Mount static files
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Tag all log records of a request with its correlation ID.
+    
+    Uses the client's X-Request-ID header when present and echoes the ID
+    back in the response.
+    """
+    token = set_correlation_id(request.headers.get("X-Request-ID"))
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = correlation_id.get()
+        return response
+    finally:
+        correlation_id.reset(token)
+
+# Mount static files (fingerprinted and precompressed at startup)
 static_path = Path(__file__).parent.parent / "static"
+static_files = None
 if static_path.exists():
-    app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+    static_files = FingerprintedStaticFiles(str(static_path), prefix="/static")
+    app.mount("/static", static_files, name="static")
 
 # Setup templates
 templates_path = Path(__file__).parent / "templates"
 templates = Jinja2Templates(directory=str(templates_path))
 
-# Initialize services
-pdf_handler = PDFHandler(settings.contract_pdf_path)
-email_service = EmailService(
-    settings.gmail_client_id,
-    settings.gmail_client_secret,
-    settings.gmail_refresh_token
+# Services are built lazily: the background warm-up started by the
+# lifespan handler (or the first request that needs one) authenticates
+# with Google and parses the template, so the process accepts traffic
+# immediately. Each name below proxies to the built service.
+services = ServiceRegistry()
+
+pdf_handler = services.register(
+    "pdf",
+    lambda: PDFHandler(
+        settings.contract_pdf_path,
+        settings.pdf_save_profile,
+        fonts_folder=settings.fonts_folder
+    ),
+    warmup=lambda handler: handler.get_blank_template()
+)
+email_service = services.register(
+    "gmail",
+    lambda: EmailService(
+        settings.gmail_client_id,
+        settings.gmail_client_secret,
+        settings.gmail_refresh_token,
+        backend=create_gmail_backend(
+            settings.gmail_backend,
+            latency=settings.fake_gmail_latency,
+            error_rate=settings.fake_error_rate,
+            quota=settings.fake_gmail_quota_per_minute
+        )
+    ),
+    check=lambda service: service.client is not None
+)
+sheets_service = services.register(
+    "sheets",
+    lambda: SheetsService(
+        settings.google_sheets_credentials_file,
+        settings.google_sheets_spreadsheet_id,
+        flush_max_rows=settings.sheets_flush_max_rows,
+        flush_interval=settings.sheets_flush_interval,
+        spill_file=settings.sheets_spill_file,
+        backend=create_sheets_backend(
+            settings.sheets_backend,
+            latency=settings.fake_sheets_latency,
+            error_rate=settings.fake_error_rate,
+            quota=settings.fake_sheets_quota_per_minute
+        )
+    ),
+    # Ensure Google Sheets has headers
+    warmup=lambda service: service.ensure_headers(),
+    check=lambda service: service.spreadsheet is not None
+)
+sheet_mirror = services.register(
+    "sheet_mirror",
+    lambda: SheetMirror(
+        sheets_service.get(),
+        settings.sheet_mirror_db_path,
+        sync_interval=settings.sheet_mirror_sync_interval
+    ),
+    # Catch up with the sheet, then keep syncing in the background
+    warmup=lambda mirror: mirror.start()
 )
-sheets_service = SheetsService(
-    settings.google_sheets_credentials_file,
-    settings.google_sheets_spreadsheet_id
+contract_numbers = services.register(
+    "contract_numbers",
+    lambda: ContractNumberAllocator(
+        sheet_mirror.get(),
+        settings.contract_numbers_db_path,
+        reservation_ttl=settings.contract_number_reservation_ttl,
+        sync_interval=settings.contract_number_sync_interval
+    ),
+    warmup=lambda allocator: allocator.sync()
 )
 
-# Ensure Google Sheets has headers
-try:
-    sheets_service.ensure_headers()
-except Exception as e:
-    print(f"Warning: Could not initialize Google Sheets headers: {e}")
+# Stage executors keep blocking PDF/Sheets/Gmail work off the event loop
+if settings.pdf_use_processes:
+    pdf_executor = StageExecutor(
+        "pdf",
+        settings.pdf_workers,
+        use_processes=True,
+        initializer=batch.init_worker,
+        initargs=(
+            settings.contract_pdf_path,
+            settings.pdf_save_profile,
+            settings.fonts_folder,
+            settings.log_level,
+            settings.log_format
+        )
+    )
+    render_contract = batch.render_contract_bytes
+else:
+    pdf_executor = StageExecutor("pdf", 1)
+    
+    def render_contract(data: dict) -> bytes:
+        return pdf_handler.render_pdf(data)
+sheets_executor = StageExecutor("sheets", settings.sheets_workers)
+# Contracts are archived (content-addressed, indexed) off the submission path
+contract_archive = ContractArchive(settings.output_folder, settings.archive_db_path)
+archive_executor = StageExecutor("archive", 1)
+_archive_tasks: set = set()
 
+# Repeated submissions (double-clicks, browser retries) map to the first job
+submission_cache = SubmissionCache(settings.submission_cache_size, settings.submission_cache_ttl)
 
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    """Render the contract form page."""
-    # Load placeholders
+# Emails are sent by queue workers; outcomes are written back to the sheet
+mail_queue = MailQueue(
+    email_service,
+    settings.mail_queue_db_path,
+    workers=settings.email_workers,
+    rate_per_second=settings.email_rate_per_second,
+    max_attempts=settings.email_max_attempts,
+    base_delay=settings.email_retry_base_delay,
+    on_status=lambda contract_no, status: sheets_service.update_contract_email_status(contract_no, status)
+)
+
+
+def archive_pdf(pdf_bytes: bytes, data: dict, digest: str):
+    """Archive a contract in the background (not awaited)."""
+    task = asyncio.create_task(archive_executor.run(contract_archive.store, pdf_bytes, data, digest))
+    _archive_tasks.add(task)
+    
+    def done(task: asyncio.Task):
+        _archive_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Could not archive contract %s: %s", data["no"], task.exception())
+    
+    task.add_done_callback(done)
+
+
+async def render_stage(job: dict) -> dict:
+    """Render the contract PDF for a job.
+    
+    The PDF stays in memory for the email stage; archiving it is an
+    optional background side effect.
+    """
+    data = job["payload"]["data"]
+    pdf_bytes = await pdf_executor.run(render_contract, data)
+    job["artifacts"]["pdf"] = pdf_bytes
+    digest = contract_digest(pdf_bytes)
+    if "data_hash" in job["payload"]:
+        submission_cache.store_pdf(job["payload"]["data_hash"], job["id"], pdf_bytes)
+    
+    if settings.archive_pdfs:
+        archive_pdf(pdf_bytes, data, digest)
+    
+    return {
+        "pdf_generated": True,
+        "pdf_path": str(contract_archive.path_for(digest)) if settings.archive_pdfs else None,
+        "pdf_sha256": digest,
+        "pdf_size": len(pdf_bytes)
+    }
+
+
+async def persist_stage(job: dict) -> dict:
+    """Log the submission to Google Sheets."""
+    data = job["payload"]["data"]
+    
+    def persist() -> bool:
+        saved = sheets_service.append_submission(data)
+        contract_numbers.commit(data["no"], job["payload"].get("reservation_token"))
+        return saved
+    
+    sheets_success = await sheets_executor.run(persist)
+    return {"sheets_saved": sheets_success}
+
+
+def enqueue_contract_email(data: dict, pdf_bytes: bytes) -> int:
+    """Queue the contract email to the client (admin in CC)."""
+    return mail_queue.enqueue_contract_email(
+        data["no"],
+        contract_pdf=pdf_bytes,
+        client_email=data["contact_email"],
+        client_name=f"{data['contact_first_name']} {data['contact_last_name']}",
+        student_name=f"{data['student_first_name']} {data['student_last_name']}",
+        contract_pdf_path=contract_filename(data),
+        admin_email=settings.admin_email
+    )
+
+
+async def load_contract_pdf(job: dict) -> bytes:
+    """Return a job's contract PDF from the submission cache or the archive.
+    
+    The PDF is only rendered again if neither has it.
+    """
+    data_hash = job["payload"].get("data_hash")
+    pdf_bytes = submission_cache.get_pdf(data_hash) if data_hash else None
+    digest = job["result"].get("pdf_sha256")
+    if pdf_bytes is None and digest:
+        pdf_bytes = contract_archive.read(digest)
+    if pdf_bytes is None:
+        pdf_bytes = await pdf_executor.run(render_contract, job["payload"]["data"])
+    return pdf_bytes
+
+
+async def email_stage(job: dict) -> dict:
+    """Queue the contract email to the client (admin in CC)."""
+    # Rendered bytes are not journaled; after a restart use the archive
+    pdf_bytes = job["artifacts"].get("pdf")
+    if pdf_bytes is None:
+        pdf_bytes = await load_contract_pdf(job)
+    
+    return {"email_id": enqueue_contract_email(job["payload"]["data"], pdf_bytes)}
+
+
+# Submissions are processed in the background; progress is journaled in SQLite
+job_store = JobStore(settings.jobs_db_path)
+pipeline = SubmissionPipeline(
+    job_store,
+    {
+        "render": render_stage,
+        "persist": persist_stage,
+        "email": email_stage,
+    },
+    workers=settings.pipeline_workers
+)
+
+def load_placeholders() -> list:
+    """Load the template placeholders (from placeholders.json if present)."""
     placeholders_file = Path("placeholders.json")
     if placeholders_file.exists():
         with open(placeholders_file, 'r', encoding='utf-8') as f:
-            placeholders = json.load(f)
-    else:
-        placeholders = PDFHandler.get_placeholders_from_pdf(settings.contract_pdf_path)
+            return json.load(f)
+    return PDFHandler.get_placeholders_from_pdf(settings.contract_pdf_path)
+
+
+_form_page: Optional[CachedAsset] = None
+
+
+def form_page() -> CachedAsset:
+    """Return the rendered form page, rendering it on first use.
     
-    return templates.TemplateResponse(
-        "form.html",
-        {
-            "request": request,
-            "placeholders": placeholders
-        }
-    )
+    The page does not depend on the request, so it is rendered (and
+    compressed) once at startup instead of on every GET.
+    """
+    global _form_page
+    if _form_page is None:
+        html = templates.get_template("form.html").render(
+            placeholders=load_placeholders(),
+            asset_url=static_files.url if static_files else lambda path: f"/static/{path}"
+        )
+        _form_page = CachedAsset(html.encode("utf-8"), "text/html; charset=utf-8")
+    return _form_page
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    """Serve the contract form page (ETag, 304 and gzip/brotli)."""
+    return form_page().response(request.headers, REVALIDATE_CACHE_CONTROL)
 
 
 @app.post("/submit-contract")
@@ -92,8 +359,17 @@ async def submit_contract(
     if_14_date: str = Form(""),
     subscriptions_types: str = Form(...),
     timeslots: str = Form(...),
+    reservation_token: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None),
 ):
-    """Handle contract form submission."""
+    """Handle contract form submission.
+    
+    Submitting the same data again (or reusing the Idempotency-Key header)
+    while the first submission is remembered returns its job instead of
+    processing the contract twice. The reservation token of the contract
+    number (from /api/next-contract-number) ends its reservation once the
+    contract is logged.
+    """
     try:
         # Create form data model
         form_data = ContractFormData(
@@ -122,41 +398,53 @@ async def submit_contract(
         
         # Convert to dict for processing
         data_dict = form_data.model_dump()
+        data_hash = canonical_hash(data_dict)
         
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"contract_{student_last_name}_{student_first_name}_{timestamp}.pdf"
-        output_path = Path(settings.output_folder) / output_filename
-        
-        # Generate PDF
-        pdf_path = pdf_handler.generate_pdf(data_dict, str(output_path))
+        # A repeated submission gets the earlier job, unless that one failed
+        job_id = submission_cache.lookup(data_hash, idempotency_key)
+        job = job_store.get(job_id) if job_id else None
+        if job and job["status"] != "failed":
+            return JSONResponse(
+                content={
+                    "success": True,
+                    "message": "Contractul a fost deja primit.",
+                    "job_id": job_id,
+                    "status": job["status"],
+                    "status_url": f"/jobs/{job_id}",
+                    "duplicate": True
+                },
+                status_code=200
+            )
         
-        # Save to Google Sheets
-        sheets_success = sheets_service.append_submission(data_dict)
-        
-        # Send email
-        email_success = email_service.send_contract_email(
-            client_email=contact_email,
-            client_name=f"{contact_first_name} {contact_last_name}",
-            student_name=f"{student_first_name} {student_last_name}",
-            contract_pdf_path=pdf_path,
-            admin_email=settings.admin_email
-        )
+        # Queue for render → persist → email; the client polls /jobs/{id}
+        job_id = pipeline.submit({
+            "data": data_dict,
+            "data_hash": data_hash,
+            "reservation_token": reservation_token
+        })
+        submission_cache.remember(data_hash, job_id, idempotency_key)
         
         return JSONResponse(
             content={
                 "success": True,
-                "message": "Contract generat și trimis cu succes!",
-                "pdf_generated": True,
-                "sheets_saved": sheets_success,
-                "email_sent": email_success,
-                "pdf_path": str(output_path)
+                "message": "Contractul a fost primit și este în procesare.",
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/jobs/{job_id}"
             },
-            status_code=200
+            status_code=202
         )
         
+    except IdempotencyKeyConflict as e:
+        return JSONResponse(
+            content={
+                "success": False,
+                "message": str(e)
+            },
+            status_code=422
+        )
     except Exception as e:
-        print(f"Error processing contract: {e}")
+        logger.exception("Error processing contract: %s", e)
         return JSONResponse(
             content={
                 "success": False,
@@ -166,14 +454,135 @@ async def submit_contract(
         )
 
 
+def _job_response(job: dict) -> dict:
+    """Build the public status view of a job."""
+    result = job["result"]
+    mail = mail_queue.get(result["email_id"]) if "email_id" in result else None
+    email_status = mail["status"] if mail else None
+    response = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "pdf_generated": result.get("pdf_generated", False),
+        "sheets_saved": result.get("sheets_saved", False),
+        "email_sent": email_status == "sent",
+        "email_status": email_status,
+        "pdf_path": result.get("pdf_path"),
+        "pdf_url": f"/jobs/{job['id']}/pdf" if result.get("pdf_generated") else None,
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+    
+    if job["status"] == "completed":
+        response["success"] = True
+        response["message"] = (
+            "Contract generat și trimis cu succes!" if email_status == "sent"
+            else "Contract generat cu succes! Emailul este în curs de trimitere."
+        )
+    elif job["status"] == "failed":
+        response["success"] = False
+        response["message"] = f"Eroare la procesarea contractului: {job['error']}"
+    
+    return response
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the processing status of a submission."""
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return _job_response(job)
+
+
+def attachment_headers(filename: str) -> dict:
+    """Content-Disposition for a download named `filename` (RFC 6266).
+    
+    Header values are latin-1, so names with Romanian diacritics go in
+    `filename*` (UTF-8, percent-encoded) with an ASCII `filename` fallback
+    for old clients.
+    """
+    fallback = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    fallback = fallback.replace('"', "").replace("\\", "")
+    return {"Content-Disposition": f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"}
+
+
+@app.get("/jobs/{job_id}/pdf")
+async def download_job_pdf(job_id: str):
+    """Download the contract PDF of a submission.
+    
+    Served from the archive when present, otherwise rendered again in
+    memory from the submitted data.
+    """
+    job = job_store.get(job_id)
+    if not job or not job["result"].get("pdf_generated"):
+        raise HTTPException(status_code=404, detail="Contract not found")
+    
+    filename = contract_filename(job["payload"]["data"])
+    digest = job["result"].get("pdf_sha256")
+    if digest and contract_archive.path_for(digest).exists():
+        return FileResponse(
+            contract_archive.path_for(digest),
+            media_type="application/pdf",
+            headers=attachment_headers(filename)
+        )
+    
+    pdf_bytes = await pdf_executor.run(render_contract, job["payload"]["data"])
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=attachment_headers(filename))
+
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Resume a failed submission from the stage that failed."""
+    if not pipeline.retry(job_id):
+        raise HTTPException(status_code=409, detail="Only failed jobs can be retried")
+    
+    return _job_response(job_store.get(job_id))
+
+
+@app.post("/jobs/{job_id}/resend")
+async def resend_job_email(job_id: str):
+    """Send the contract email of a completed submission again.
+    
+    The PDF comes from the submission cache or the archive instead of
+    being rendered again.
+    """
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail="Only completed jobs can be re-sent")
+    
+    email_id = enqueue_contract_email(job["payload"]["data"], await load_contract_pdf(job))
+    mail = mail_queue.get(email_id)
+    return {
+        "success": True,
+        "job_id": job_id,
+        "email_id": email_id,
+        "email_status": mail["status"] if mail else None
+    }
+
+
 @app.get("/api/next-contract-number")
-async def get_next_contract_number():
-    """Get the next contract number based on Google Sheets."""
+async def get_next_contract_number(release_token: Optional[str] = None):
+    """Reserve the next contract number (synced with Google Sheets).
+    
+    Args:
+        release_token: Reservation token of the number the form held until
+            now; that reservation is freed
+    """
     try:
-        next_number = sheets_service.get_next_contract_number()
+        def reserve():
+            if release_token:
+                contract_numbers.release(release_token)
+            return contract_numbers.reserve()
+        
+        next_number, token = await sheets_executor.run(reserve)
         return {
             "success": True,
-            "contract_number": next_number
+            "contract_number": next_number,
+            "reservation_token": token
         }
     except Exception as e:
         # Fallback to default if error
@@ -186,15 +595,48 @@ async def get_next_contract_number():
         }
 
 
+# Queue depths are read when /metrics is scraped
+PIPELINE_QUEUE_DEPTH.set_function(pipeline.depth)
+MAIL_QUEUE_DEPTH.set_function(mail_queue.depth)
+SHEETS_BUFFER_DEPTH.set_function(lambda: sheets_service.buffer.depth() if sheets_service.is_built else 0)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (stage latencies, failures, queue depths)."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "gmail_configured": bool(settings.gmail_client_id and settings.gmail_refresh_token),
-        "sheets_configured": bool(settings.google_sheets_spreadsheet_id),
-        "pdf_template_exists": Path(settings.contract_pdf_path).exists()
-    }
+    """Health check endpoint with per-service readiness.
+    
+    Returns 503 while a service is still starting or failed to start.
+    Services that started without a Google connection are "unavailable"
+    and make the overall status "degraded".
+    """
+    readiness = services.readiness()
+    statuses = {service["status"] for service in readiness.values()}
+    
+    if statuses & {"pending", "starting", "failed"}:
+        status, status_code = "starting" if "failed" not in statuses else "unhealthy", 503
+    elif "unavailable" in statuses:
+        status, status_code = "degraded", 200
+    else:
+        status, status_code = "healthy", 200
+    
+    return JSONResponse(
+        content={
+            "status": status,
+            "services": readiness,
+            "gmail_configured": bool(settings.gmail_client_id and settings.gmail_refresh_token),
+            "sheets_configured": bool(settings.google_sheets_spreadsheet_id),
+            "pdf_template_exists": Path(settings.contract_pdf_path).exists(),
+            "gmail_send": email_service.get_metrics() if email_service.is_built else {}
+        },
+        status_code=status_code
+    )
 
 
 if __name__ == "__main__":
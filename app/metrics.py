@@ -0,0 +1,82 @@
+"""Prometheus metrics for the submission path.
+
+Metrics are module-level objects updated in place (a lock and a few adds
+per observation); the text exposition is only built when `/metrics` is
+scraped. Queue depth gauges are callbacks evaluated at scrape time.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+
+# Buckets from 1 ms to 30 s cover both local PDF steps and Google API calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PDF_RENDER_SECONDS = Histogram(
+    "contract_pdf_render_seconds",
+    "Time spent in each step of rendering a contract PDF",
+    ["step"],  # open, search, redact, insert, save
+    buckets=LATENCY_BUCKETS
+)
+SHEETS_APPEND_SECONDS = Histogram(
+    "contract_sheets_batch_append_seconds",
+    "Time of the append_rows call in one batched flush to Google Sheets",
+    buckets=LATENCY_BUCKETS
+)
+SHEETS_FLUSH_SECONDS = Histogram(
+    "contract_sheets_flush_seconds",
+    "Time of one batched write to Google Sheets",
+    buckets=LATENCY_BUCKETS
+)
+CONTRACT_NUMBER_SECONDS = Histogram(
+    "contract_number_lookup_seconds",
+    "Time to reserve the next contract number",
+    buckets=LATENCY_BUCKETS
+)
+GMAIL_SEND_SECONDS = Histogram(
+    "contract_gmail_send_seconds",
+    "Latency of Gmail users.messages.send calls",
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_FAILURES = Counter(
+    "contract_pipeline_stage_failures",
+    "Submission pipeline stage failures",
+    ["stage"]
+)
+JOB_RETRIES = Counter(
+    "contract_pipeline_retries",
+    "Failed submissions re-queued for retry"
+)
+SHEETS_FLUSH_FAILURES = Counter(
+    "contract_sheets_flush_failures",
+    "Batched Google Sheets writes that failed and were re-queued"
+)
+GMAIL_SEND_FAILURES = Counter(
+    "contract_gmail_send_failures",
+    "Gmail send calls that raised an error"
+)
+EMAIL_RETRIES = Counter(
+    "contract_email_retries",
+    "Queued emails rescheduled after a failed attempt"
+)
+EMAIL_FAILURES = Counter(
+    "contract_email_failures",
+    "Queued emails that failed permanently"
+)
+
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "contract_pipeline_queue_depth",
+    "Submission jobs waiting for a pipeline worker"
+)
+MAIL_QUEUE_DEPTH = Gauge(
+    "contract_mail_queue_depth",
+    "Emails queued or being sent"
+)
+SHEETS_BUFFER_DEPTH = Gauge(
+    "contract_sheets_buffer_depth",
+    "Rows and status updates waiting to be written to Google Sheets"
+)
+
+
+def render_latest() -> tuple:
+    """Return (body, content type) of the Prometheus text exposition."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,145 @@
+"""Lazily constructed services with background warm-up and readiness."""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """Build a service on first use and proxy attribute access to it.
+
+    Construction (authentication, discovery, template parsing) runs either
+    in the background warm-up or, if something needs the service earlier,
+    in the thread that first touches it; other callers wait for it. Only
+    touch a service from async code through an executor while it is not
+    ready.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warmup: Optional[Callable[[Any], None]] = None,
+        check: Optional[Callable[[Any], bool]] = None
+    ):
+        """Register how to build the service.
+
+        Args:
+            name: Service name used in readiness reports
+            factory: Builds the service instance
+            warmup: Optional call made once after building (e.g. caches)
+            check: Optional test of the built instance; False marks the
+                service "unavailable" (e.g. not connected to Google)
+        """
+        self._name = name
+        self._factory = factory
+        self._warmup = warmup
+        self._check = check
+        self._instance = None
+        self._status = "pending"
+        self._error: Optional[str] = None
+        self._seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """Return the service, building and warming it up if needed."""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                self._build()
+            return self._instance
+
+    def _build(self):
+        """Build and warm up the service (caller holds the lock)."""
+        self._status = "starting"
+        started = time.perf_counter()
+        try:
+            instance = self._factory()
+            if self._warmup:
+                self._warmup(instance)
+        except Exception as e:
+            self._status = "failed"
+            self._error = str(e)
+            logger.exception("Could not start %s service: %s", self._name, e)
+            raise
+
+        self._seconds = time.perf_counter() - started
+        if self._check and not self._check(instance):
+            self._status = "unavailable"
+        else:
+            self._status = "ready"
+        self._error = None
+        self._instance = instance
+        logger.info("%s service %s in %.2fs", self._name, self._status, self._seconds)
+
+    @property
+    def is_built(self) -> bool:
+        return self._instance is not None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._status == "ready"
+
+    def readiness(self) -> Dict[str, Any]:
+        """Status ("pending", "starting", "ready", "unavailable" or "failed")."""
+        report: Dict[str, Any] = {"status": self._status}
+        if self._seconds is not None:
+            report["startup_seconds"] = round(self._seconds, 3)
+        if self._error:
+            report["error"] = self._error
+        return report
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
+class ServiceRegistry:
+    """Holds the app's lazy services and warms them up in the background."""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+        self._threads: List[threading.Thread] = []
+
+    def register(self, name: str, factory: Callable[[], Any], **options) -> LazyService:
+        """Register a lazy service; see LazyService for the options."""
+        service = LazyService(name, factory, **options)
+        self._services[name] = service
+        return service
+
+    def start_warmup(self):
+        """Build all services in background threads (one per service)."""
+        for name, service in self._services.items():
+            thread = threading.Thread(target=self._warm, args=(service,), name=f"warmup-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @staticmethod
+    def _warm(service: LazyService):
+        try:
+            service.get()
+        except Exception:
+            # Already logged; the next use retries the build
+            pass
+
+    def readiness(self) -> Dict[str, Dict[str, Any]]:
+        """Readiness report per service."""
+        return {name: service.readiness() for name, service in self._services.items()}
+
+    def close(self):
+        """Close the services that were built, in reverse registration order."""
+        for name, service in reversed(list(self._services.items())):
+            if not service.is_built:
+                continue
+            close = getattr(service.get(), "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                logger.error("Error closing %s service: %s", name, e)
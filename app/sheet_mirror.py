@@ -0,0 +1,307 @@
+"""Local SQLite replica of the submissions sheet."""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from gspread.exceptions import APIError
+
+from .backends import create_sheets_backend
+from .config import settings
+from .sheets_service import EMAIL_STATUS_COLUMN, SheetsService
+from .sqlite_store import SQLiteStore, add_find_arguments, find_query
+
+
+logger = logging.getLogger(__name__)
+
+# Sheet columns (1-based) copied into indexed table columns
+MIRRORED_COLUMNS = {
+    "timestamp": 1,
+    "contract_no": 2,
+    "contact_email": 8,
+    "contact_cnp": 11,
+    "student_first_name": 15,
+    "student_last_name": 16,
+    "email_status": EMAIL_STATUS_COLUMN,
+}
+
+# Last column of a submission row ("X")
+LAST_COLUMN_LETTER = "X"
+
+
+class SheetMirror(SQLiteStore):
+    """Keep a local copy of the submissions worksheet in SQLite.
+
+    Sheet rows are append-only from the app's point of view, so a sync
+    only reads the rows past the last mirrored row (one `get` call); a
+    background thread syncs every `sync_interval` seconds. Reads then cost
+    a local query instead of an API call. Email statuses written by the
+    app are applied to the mirror directly; edits made by hand to rows that
+    were already mirrored are only picked up by `rebuild`.
+    """
+
+    def __init__(self, sheets_service: SheetsService, db_path: str, sync_interval: float = 30.0):
+        """Open the mirror database and attach it to the Sheets service.
+
+        Args:
+            sheets_service: Sheets service providing the worksheet
+            db_path: Path to the SQLite mirror database
+            sync_interval: Seconds between background syncs
+        """
+        super().__init__(db_path)
+        self.sheets_service = sheets_service
+        self.sync_interval = sync_interval
+
+        self._sync_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS submissions (
+                row_number INTEGER PRIMARY KEY,
+                timestamp TEXT,
+                contract_no TEXT,
+                contact_email TEXT,
+                contact_cnp TEXT,
+                student_first_name TEXT,
+                student_last_name TEXT,
+                email_status TEXT,
+                row_values TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS submissions_contract_no ON submissions (contract_no);
+            CREATE INDEX IF NOT EXISTS submissions_email ON submissions (contact_email);
+            CREATE INDEX IF NOT EXISTS submissions_cnp ON submissions (contact_cnp);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'rows_seen'").fetchone()
+        self._rows_seen = int(row[0]) if row else 0
+        self._last_sync = 0.0
+
+        # Email status updates look rows up here instead of in the sheet
+        sheets_service.mirror = self
+
+    def start(self):
+        """Sync now, then keep syncing in a background thread."""
+        self.sync()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="sheet-mirror", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop the background sync and close the database."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+            self._thread = None
+        super().close()
+
+    def _run(self):
+        while not self._stopped.wait(self.sync_interval):
+            self.sync()
+
+    def sync(self) -> int:
+        """Copy the rows added to the sheet since the last sync.
+
+        Returns:
+            Number of rows mirrored (0 if the sheet is not reachable)
+        """
+        with self._sync_lock:
+            self._last_sync = time.time()
+            try:
+                worksheet = self.sheets_service.get_worksheet()
+                if worksheet is None:
+                    return 0
+                new_rows = worksheet.get(f"A{self._rows_seen + 1}:{LAST_COLUMN_LETTER}")
+            except APIError as e:
+                # Every row of the grid is mirrored: the range starts below
+                # it. The cached row_count is stale after appends, so the
+                # request is made anyway and the error means "no new rows".
+                if e.response.status_code == 400 and "exceeds grid limits" in str(e):
+                    return 0
+                logger.error("Error syncing sheet mirror: %s", e)
+                return 0
+            except Exception as e:
+                logger.error("Error syncing sheet mirror: %s", e)
+                return 0
+
+            first_row = self._rows_seen + 1
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO submissions (row_number, timestamp, contract_no, contact_email, "
+                    "contact_cnp, student_first_name, student_last_name, email_status, row_values) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        self._record(row_number, values)
+                        for row_number, values in enumerate(new_rows, first_row)
+                        # The header row is not a submission
+                        if row_number > 1 or (values and values[0] != "Timestamp")
+                    ]
+                )
+                self._rows_seen += len(new_rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('rows_seen', ?)",
+                    (str(self._rows_seen),)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('synced_at', ?)",
+                    (datetime.now().isoformat(timespec="seconds"),)
+                )
+                self._conn.commit()
+
+            if new_rows:
+                logger.debug("Mirrored %d sheet rows", len(new_rows), extra={"rows_seen": self._rows_seen})
+            return len(new_rows)
+
+    def sync_if_stale(self, max_age: float):
+        """Sync unless the last sync is younger than max_age seconds."""
+        if time.time() - self._last_sync >= max_age:
+            self.sync()
+
+    def rebuild(self) -> int:
+        """Drop the mirror and copy the whole sheet again.
+
+        Returns:
+            Number of rows mirrored
+        """
+        with self._sync_lock:
+            with self._lock:
+                self._conn.execute("DELETE FROM submissions")
+                self._conn.execute("DELETE FROM sync_state")
+                self._conn.commit()
+                self._rows_seen = 0
+        return self.sync()
+
+    @staticmethod
+    def _record(row_number: int, values: List[Any]) -> Tuple:
+        def column(number: int) -> str:
+            return str(values[number - 1]) if len(values) >= number else ""
+
+        return (
+            row_number,
+            column(MIRRORED_COLUMNS["timestamp"]),
+            column(MIRRORED_COLUMNS["contract_no"]),
+            column(MIRRORED_COLUMNS["contact_email"]).lower(),
+            column(MIRRORED_COLUMNS["contact_cnp"]),
+            column(MIRRORED_COLUMNS["student_first_name"]),
+            column(MIRRORED_COLUMNS["student_last_name"]),
+            column(MIRRORED_COLUMNS["email_status"]),
+            json.dumps(values, ensure_ascii=False),
+        )
+
+    @property
+    def rows_seen(self) -> int:
+        """Number of sheet rows mirrored so far (header included)."""
+        return self._rows_seen
+
+    def contract_numbers(self, after_row: int = 0) -> List[Tuple[int, str]]:
+        """Return (row number, contract number) of rows after after_row."""
+        with self._lock:
+            return [
+                (row["row_number"], row["contract_no"])
+                for row in self._conn.execute(
+                    "SELECT row_number, contract_no FROM submissions WHERE row_number > ? ORDER BY row_number",
+                    (after_row,)
+                )
+            ]
+
+    def row_number(self, contract_no: str) -> Optional[int]:
+        """Return the sheet row holding a contract number, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row_number FROM submissions WHERE contract_no = ? ORDER BY row_number DESC LIMIT 1",
+                (contract_no,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def find(
+        self,
+        contract_no: Optional[str] = None,
+        contact_email: Optional[str] = None,
+        contact_cnp: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Find mirrored submissions by contract number, email or CNP.
+
+        Returns:
+            Matching submissions (newest first) with their sheet row values
+        """
+        query, params = find_query(
+            "submissions",
+            (
+                ("contract_no", contract_no),
+                ("contact_email", contact_email.lower() if contact_email else None),
+                ("contact_cnp", contact_cnp),
+            ),
+            "row_number DESC",
+            limit
+        )
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        submissions = []
+        for row in rows:
+            submission = dict(row)
+            submission["row_values"] = json.loads(submission["row_values"])
+            submissions.append(submission)
+        return submissions
+
+    def set_email_status(self, contract_no: str, status: str):
+        """Apply an email status the app wrote to the sheet."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE submissions SET email_status = ? WHERE contract_no = ?",
+                (status, contract_no)
+            )
+            self._conn.commit()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: sync or rebuild the mirror, find submissions."""
+    parser = argparse.ArgumentParser(description="Sync the sheet mirror and find submissions.")
+    parser.add_argument("--rebuild", action="store_true", help="Copy the whole sheet again (picks up manual edits)")
+    add_find_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # No spill file: pending writes belong to the running app
+    sheets_service = SheetsService(
+        settings.google_sheets_credentials_file,
+        settings.google_sheets_spreadsheet_id,
+        backend=create_sheets_backend(settings.sheets_backend)
+    )
+    mirror = SheetMirror(sheets_service, settings.sheet_mirror_db_path)
+    try:
+        if args.rebuild:
+            print(f"Mirrored {mirror.rebuild()} rows", file=sys.stderr)
+        else:
+            mirror.sync()
+        if not (args.no or args.email or args.cnp):
+            return 0
+        submissions = mirror.find(
+            contract_no=args.no,
+            contact_email=args.email,
+            contact_cnp=args.cnp,
+            limit=args.limit
+        )
+    finally:
+        mirror.close()
+        sheets_service.close()
+
+    print(json.dumps(submissions, indent=2, ensure_ascii=False))
+    return 0 if submissions else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,267 @@
 """Google Sheets integration service."""
 import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from pathlib import Path
+import json
+import logging
+import re
+import threading
+import time
+
+from .backends import GoogleSheetsBackend, SheetsBackend
+from .metrics import SHEETS_APPEND_SECONDS, SHEETS_FLUSH_FAILURES, SHEETS_FLUSH_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+# Column 24 ("X") is "Email Sent"
+EMAIL_STATUS_COLUMN = 24
+EMAIL_STATUS_COLUMN_LETTER = "X"
+
+
+class SheetsWriteBuffer:
+    """Write-behind buffer that groups Sheets writes into batch calls.
+    
+    Appended rows are collected and written with a single `append_rows` per
+    flush; email status cell updates are coalesced into one `batch_update`.
+    A flush happens when `max_rows` rows are pending or every
+    `flush_interval` seconds. Pending writes are mirrored to a local spill
+    file so they survive a crash and are replayed on the next start.
+    """
+    
+    def __init__(self, service: "SheetsService", max_rows: int = 20,
+                 flush_interval: float = 2.0, spill_file: Optional[str] = None):
+        """Initialize the buffer and start the background flusher.
+        
+        Args:
+            service: Sheets service providing the worksheet
+            max_rows: Pending row count that triggers an immediate flush
+            flush_interval: Maximum seconds a write waits before flushing
+            spill_file: JSON-lines file holding writes not yet flushed
+        """
+        self.service = service
+        self.max_rows = max(1, max_rows)
+        self.flush_interval = flush_interval
+        self.spill_file = Path(spill_file) if spill_file else None
+        
+        self._rows: List[Dict[str, Any]] = []  # {"key": ..., "row": [...]}
+        self._statuses: Dict[int, str] = {}  # row number → email status
+        self._row_numbers: Dict[str, int] = {}  # key → sheet row number
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        
+        self._load_spill()
+        
+        self._thread = threading.Thread(target=self._run, name="sheets-flush", daemon=True)
+        self._thread.start()
+    
+    def add_row(self, row: List[Any], key: Optional[str] = None):
+        """Queue a row for appending.
+        
+        Args:
+            row: Row values
+            key: Optional identifier (contract number) used to find the
+                row number once written
+        """
+        entry = {"key": key, "row": row}
+        with self._lock:
+            self._rows.append(entry)
+            self._spill(entry)
+            pending = len(self._rows)
+        
+        if pending >= self.max_rows:
+            self._wake.set()
+    
+    def set_status(self, row_number: int, status: str):
+        """Queue an email status update; later updates to a row win."""
+        with self._lock:
+            self._statuses[row_number] = status
+            self._spill({"status_row": row_number, "status": status})
+    
+    def set_status_for_key(self, key: str, status: str) -> bool:
+        """Set the email status of a row identified by its key.
+        
+        Rows still waiting in the buffer are updated in place, so the status
+        is written together with the row.
+        
+        Returns:
+            True if the row was found
+        """
+        with self._lock:
+            for entry in self._rows:
+                if entry["key"] == key:
+                    entry["row"][EMAIL_STATUS_COLUMN - 1] = status
+                    self._rewrite_spill()
+                    return True
+            row_number = self._row_numbers.get(key)
+        
+        if row_number is None:
+            return False
+        
+        self.set_status(row_number, status)
+        return True
+    
+    def depth(self) -> int:
+        """Number of rows and status updates waiting to be written."""
+        with self._lock:
+            return len(self._rows) + len(self._statuses)
+    
+    def pending_keys(self) -> List[str]:
+        """Keys of rows not yet written to the sheet."""
+        with self._lock:
+            return [entry["key"] for entry in self._rows if entry["key"]]
+    
+    def flush(self) -> bool:
+        """Write all pending rows and status updates to the sheet.
+        
+        Returns:
+            True if nothing is left pending
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows = self._rows
+                statuses = self._statuses
+                self._rows = []
+                self._statuses = {}
+            
+            if not rows and not statuses:
+                return True
+            
+            try:
+                worksheet = self.service.get_worksheet()
+                if worksheet is None:
+                    self._requeue(rows, statuses)
+                    return False
+                
+                started = time.perf_counter()
+                
+                if rows:
+                    with SHEETS_APPEND_SECONDS.time():
+                        response = worksheet.append_rows([entry["row"] for entry in rows])
+                    self._record_row_numbers(rows, response)
+                    # Rows are safe in the sheet now, even if status writes
+                    # fail; drop them from the spill so a restart cannot
+                    # append them again
+                    rows = []
+                    with self._lock:
+                        self._rewrite_spill(statuses)
+                
+                if statuses:
+                    worksheet.batch_update([
+                        {
+                            "range": f"{EMAIL_STATUS_COLUMN_LETTER}{row_number}",
+                            "values": [[status]]
+                        }
+                        for row_number, status in statuses.items()
+                    ])
+                    statuses = {}
+                
+                SHEETS_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            except Exception as e:
+                SHEETS_FLUSH_FAILURES.inc()
+                logger.error("Error flushing to Google Sheets: %s", e, extra={"rows": len(rows)})
+                self._requeue(rows, statuses)
+                return False
+            
+            with self._lock:
+                self._rewrite_spill()
+            
+            return True
+    
+    def close(self):
+        """Stop the background flusher and flush what is pending."""
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.flush()
+    
+    def _requeue(self, rows: List[Dict[str, Any]], statuses: Dict[int, str]):
+        """Put writes that could not be flushed back in front of new ones."""
+        with self._lock:
+            self._rows = rows + self._rows
+            self._statuses = {**statuses, **self._statuses}
+    
+    def _record_row_numbers(self, rows: List[Dict[str, Any]], response: Dict[str, Any]):
+        """Remember sheet row numbers from the append response range."""
+        updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+        match = re.search(r"![A-Z]+(\d+)", updated_range)
+        if not match:
+            return
+        
+        first_row = int(match.group(1))
+        with self._lock:
+            for offset, entry in enumerate(rows):
+                if entry["key"]:
+                    self._row_numbers[entry["key"]] = first_row + offset
+    
+    def _spill(self, record: Dict[str, Any]):
+        """Append a pending write to the spill file (caller holds the lock)."""
+        if not self.spill_file:
+            return
+        
+        try:
+            self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning("Could not write Sheets spill file: %s", e)
+    
+    def _rewrite_spill(self, in_flight_statuses: Optional[Dict[int, str]] = None):
+        """Replace the spill file with the current pending writes (caller holds the lock).
+        
+        Args:
+            in_flight_statuses: Status updates taken by a flush that is
+                still writing them
+        """
+        if not self.spill_file:
+            return
+        
+        statuses = {**(in_flight_statuses or {}), **self._statuses}
+        try:
+            if not self._rows and not statuses:
+                self.spill_file.unlink(missing_ok=True)
+                return
+            
+            self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.spill_file.with_suffix(".tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                for entry in self._rows:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                for row_number, status in statuses.items():
+                    f.write(json.dumps({"status_row": row_number, "status": status}) + "\n")
+            temp_file.replace(self.spill_file)
+        except OSError as e:
+            logger.warning("Could not write Sheets spill file: %s", e)
+    
+    def _load_spill(self):
+        """Replay writes left in the spill file by a previous process."""
+        if not self.spill_file or not self.spill_file.exists():
+            return
+        
+        with open(self.spill_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                
+                if "status_row" in record:
+                    self._statuses[record["status_row"]] = record["status"]
+                else:
+                    self._rows.append(record)
+        
+        if self._rows or self._statuses:
+            logger.info("Replaying %d unsaved Google Sheets rows from %s", len(self._rows), self.spill_file)
 
 
 class SheetsService:
@@ -14,40 +272,67 @@ class SheetsService:
         'https://www.googleapis.com/auth/drive'
     ]
     
-    def __init__(self, credentials_file: str, spreadsheet_id: str):
+    WORKSHEET_NAME = "Sheet1"
+    
+    def __init__(self, credentials_file: str, spreadsheet_id: str,
+                 flush_max_rows: int = 20, flush_interval: float = 2.0,
+                 spill_file: Optional[str] = None,
+                 backend: Optional[SheetsBackend] = None):
         """Initialize Google Sheets service.
         
         Args:
             credentials_file: Path to service account JSON credentials
             spreadsheet_id: ID of the Google Spreadsheet
+            flush_max_rows: Buffered rows that trigger a batch write
+            flush_interval: Maximum seconds before buffered writes are flushed
+            spill_file: Local file keeping unflushed writes across crashes
+            backend: Sheets backend (defaults to Google Sheets via gspread)
         """
         self.spreadsheet_id = spreadsheet_id
         self.credentials_file = credentials_file
-        self.client = None
+        self.backend = backend or GoogleSheetsBackend()
         self.spreadsheet = None
+        self._worksheet = None
+        # Local replica used for reads, if one is attached (see SheetMirror)
+        self.mirror = None
         
-        if Path(credentials_file).exists():
+        if not self.backend.requires_credentials_file or Path(credentials_file).exists():
             self._authenticate()
+        
+        self.buffer = SheetsWriteBuffer(self, flush_max_rows, flush_interval, spill_file)
     
     def _authenticate(self):
-        """Authenticate with Google Sheets API using service account."""
+        """Open the spreadsheet through the backend (service account for Google)."""
         try:
-            credentials = Credentials.from_service_account_file(
+            self.spreadsheet = self.backend.open(
                 self.credentials_file,
-                scopes=self.SCOPES
+                self.spreadsheet_id,
+                self.SCOPES
             )
-            self.client = gspread.authorize(credentials)
-            self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
-            print(f"✅ Google Sheets connected: {self.spreadsheet.title}")
+            logger.info("Google Sheets connected: %s", self.spreadsheet.title)
         except Exception as e:
-            print(f"❌ Could not connect to Google Sheets: {e}")
-            print(f"📧 Service account: {credentials.service_account_email if 'credentials' in locals() else 'N/A'}")
-            print(f"📊 Spreadsheet ID: {self.spreadsheet_id}")
-            print(f"⚠️  Make sure the service account has access to the spreadsheet!")
-            print(f"   Run: ./setup_sheets.sh for instructions")
-            self.client = None
+            logger.error(
+                "Could not connect to Google Sheets: %s. Make sure the service account has "
+                "access to the spreadsheet (run ./setup_sheets.sh for instructions)",
+                e,
+                extra={"spreadsheet_id": self.spreadsheet_id}
+            )
             self.spreadsheet = None
     
+    def get_worksheet(self):
+        """Return the submissions worksheet, fetched once and cached."""
+        if not self.spreadsheet:
+            return None
+        
+        if self._worksheet is None:
+            self._worksheet = self.spreadsheet.worksheet(self.WORKSHEET_NAME)
+        
+        return self._worksheet
+    
+    def close(self):
+        """Flush buffered writes; call on shutdown."""
+        self.buffer.close()
+    
     def ensure_headers(self, worksheet_name: str = "Sheet1"):
         """Ensure the worksheet has proper headers."""
         if not self.spreadsheet:
@@ -97,24 +382,27 @@ class SheetsService:
                 worksheet.insert_row(headers, 1)
         except:
             worksheet.insert_row(headers, 1)
+        
+        if worksheet_name == self.WORKSHEET_NAME:
+            self._worksheet = worksheet
     
     def append_submission(self, data: Dict[str, Any]) -> bool:
         """Append a new contract submission to the spreadsheet.
         
+        The row is buffered and written in the next batch flush.
+        
         Args:
             data: Dictionary containing form data
             
         Returns:
-            True if successful, False otherwise
+            True if the row was accepted, False otherwise
         """
         if not self.spreadsheet:
-            print("❌ Spreadsheet not connected - cannot save to Google Sheets")
-            print("   Run: ./setup_sheets.sh to fix this issue")
+            logger.error("Spreadsheet not connected - cannot save to Google Sheets "
+                         "(run ./setup_sheets.sh to fix this issue)")
             return False
         
         try:
-            worksheet = self.spreadsheet.worksheet("Sheet1")
-            
             # Prepare row data
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
@@ -145,17 +433,19 @@ class SheetsService:
                 "Pending"
             ]
             
-            worksheet.append_row(row)
-            print(f"✅ Saved to Google Sheets: {data.get('student_first_name')} {data.get('student_last_name')}")
+            self.buffer.add_row(row, key=data.get("no") or None)
+            logger.debug("Queued row for Google Sheets", extra={"contract_no": data.get("no")})
             return True
             
         except Exception as e:
-            print(f"❌ Error saving to Google Sheets: {e}")
+            logger.error("Error saving to Google Sheets: %s", e, extra={"contract_no": data.get("no")})
             return False
     
     def update_email_status(self, row_number: int, status: str = "Sent"):
         """Update the email status for a specific row.
         
+        Updates are coalesced and written in the next batch flush.
+        
         Args:
             row_number: Row number in the spreadsheet
             status: Email status (Sent, Failed, etc.)
@@ -163,63 +453,37 @@ class SheetsService:
         if not self.spreadsheet:
             return
         
-        try:
-            worksheet = self.spreadsheet.worksheet("Sheet1")
-            worksheet.update_cell(row_number, 24, status)  # Column 24 is "Email Sent"
-        except Exception as e:
-            print(f"Error updating email status: {e}")
+        self.buffer.set_status(row_number, status)
     
-    def get_next_contract_number(self) -> str:
-        """Get the next contract number based on last entry in spreadsheet.
+    def update_contract_email_status(self, contract_no: str, status: str = "Sent"):
+        """Update the email status of the row holding a contract number.
         
-        Returns:
-            Next contract number in format XXX/YYYY (e.g., "001/2025")
+        Rows written by this process are located from the write buffer; other
+        rows are looked up in the sheet mirror, or else once in the
+        "Contract No" column.
+        
+        Args:
+            contract_no: Contract number of the submission
+            status: Email status (Sent, Failed, etc.)
         """
         if not self.spreadsheet:
-            # If not connected, return default
-            from datetime import datetime
-            year = datetime.now().year
-            return f"001/{year}"
+            return
+        
+        if self.mirror is not None:
+            self.mirror.set_email_status(contract_no, status)
+        
+        if self.buffer.set_status_for_key(contract_no, status):
+            return
+        
+        if self.mirror is not None:
+            row_number = self.mirror.row_number(contract_no)
+            if row_number is not None:
+                self.buffer.set_status(row_number, status)
+                return
         
         try:
-            worksheet = self.spreadsheet.worksheet("Sheet1")
-            
-            # Get all contract numbers (column 2 - "Contract No")
-            contract_numbers = worksheet.col_values(2)
-            
-            # Remove header
-            if contract_numbers and contract_numbers[0] == "Contract No":
-                contract_numbers = contract_numbers[1:]
-            
-            # Get current year
-            from datetime import datetime
-            current_year = datetime.now().year
-            
-            # Filter contracts from current year and extract numbers
-            current_year_numbers = []
-            for contract_no in contract_numbers:
-                if contract_no and '/' in contract_no:
-                    try:
-                        num_part, year_part = contract_no.split('/')
-                        if int(year_part) == current_year:
-                            # Extract numeric part (handle formats like 001, 1, etc.)
-                            num = int(num_part)
-                            current_year_numbers.append(num)
-                    except (ValueError, IndexError):
-                        continue
-            
-            # Get the highest number and add 1
-            if current_year_numbers:
-                next_number = max(current_year_numbers) + 1
-            else:
-                next_number = 1
-            
-            # Format as XXX/YYYY
-            return f"{next_number:03d}/{current_year}"
-            
+            cell = self.get_worksheet().find(contract_no, in_column=2)
+            if cell:
+                self.buffer.set_status(cell.row, status)
         except Exception as e:
-            print(f"Error getting next contract number: {e}")
-            from datetime import datetime
-            year = datetime.now().year
-            return f"001/{year}"
-
+            logger.error("Error updating email status: %s", e, extra={"contract_no": contract_no})
@@ -0,0 +1,74 @@
+"""Shared setup of the app's local SQLite databases."""
+import argparse
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+class SQLiteStore:
+    """Base class of the stores kept in a local SQLite database.
+
+    One connection is shared by the app's threads and every use of it is
+    serialized with `_lock`. The database runs in WAL mode with
+    `synchronous=NORMAL`: readers do not block the writer, and a commit
+    only waits for the log write, not for a sync of the database file.
+    """
+
+    def __init__(self, db_path: str):
+        """Open (or create) the database, creating its folder if needed.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def find_query(
+    table: str,
+    filters: Iterable[Tuple[str, Optional[Any]]],
+    order_by: str,
+    limit: int
+) -> Tuple[str, List[Any]]:
+    """Build a SELECT of the rows matching every given filter.
+
+    Args:
+        table: Table to read
+        filters: (column, value) pairs; pairs with an empty value are skipped
+        order_by: ORDER BY clause, e.g. "updated_at DESC"
+        limit: Maximum number of rows
+
+    Returns:
+        (query, params) tuple for `execute`
+    """
+    conditions = []
+    params: List[Any] = []
+    for column, value in filters:
+        if value:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    query = f"SELECT * FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by} LIMIT ?"
+    params.append(limit)
+    return query, params
+
+
+def add_find_arguments(parser: argparse.ArgumentParser):
+    """Add the lookup options shared by the command line tools."""
+    parser.add_argument("--no", default=None, help="Contract number, e.g. 007/2025")
+    parser.add_argument("--email", default=None, help="Contact email")
+    parser.add_argument("--cnp", default=None, help="Contact CNP")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of results")
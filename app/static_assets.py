@@ -0,0 +1,152 @@
+"""Fingerprinted, precompressed static assets and cached pages.
+
+Assets under `static/` are read and compressed once at startup and served
+from memory. Their URLs carry a content hash (`css/form.3f2a9c1b04de.css`)
+so browsers may cache them for a year; a changed file gets a new URL.
+Pages and assets are served with an ETag and answer `If-None-Match` with
+304. Brotli is used when the optional `brotli` package is installed and
+the client accepts it, gzip otherwise.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+# Fingerprinted assets never change at their URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages are revalidated on every load (cheap with the ETag)
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+_FINGERPRINT = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})(?P<suffix>\.[^./]+)$")
+
+
+class CachedAsset:
+    """A response body kept in memory with its ETag and compressed variants."""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.etag = f'"{self.digest[:16]}"'
+        self.encodings: Dict[str, bytes] = {}
+
+        if len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(body, quality=11)
+            self.encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+
+    def select(self, accept_encoding: str) -> Tuple[bytes, Optional[str], str]:
+        """Pick the body for an Accept-Encoding header.
+
+        Returns:
+            (body, content encoding or None, ETag of that representation)
+        """
+        accepted = set()
+        for token in accept_encoding.split(","):
+            name, _, params = token.partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and encoding in accepted:
+                # Each encoding is a distinct representation with its own ETag
+                return self.encodings[encoding], encoding, f'"{self.digest[:16]}-{encoding}"'
+        return self.body, None, self.etag
+
+    def response(self, request_headers, cache_control: str) -> Response:
+        """Build a 200 or 304 response for the request headers."""
+        body, encoding, etag = self.select(request_headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles that serves preloaded assets under fingerprinted names.
+
+    `url("css/form.css")` returns `/static/css/form.<hash>.css`. Requests
+    for that name get the in-memory (compressed) asset with a long-lived
+    Cache-Control; the plain name is still served, but revalidated. Files
+    that were not preloaded fall back to StaticFiles.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static", **kwargs):
+        """Preload every file under directory.
+
+        Args:
+            directory: Static files folder
+            prefix: URL path the app is mounted at
+        """
+        super().__init__(directory=directory, **kwargs)
+        self.prefix = prefix.rstrip("/")
+        self._assets: Dict[str, CachedAsset] = {}
+        self._urls: Dict[str, str] = {}
+
+        root = Path(directory)
+        for file in sorted(root.rglob("*")):
+            if not file.is_file():
+                continue
+            path = file.relative_to(root).as_posix()
+            media_type = mimetypes.guess_type(file.name)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type in ("application/javascript", "image/svg+xml"):
+                media_type += "; charset=utf-8"
+            asset = CachedAsset(file.read_bytes(), media_type)
+
+            fingerprinted = f"{file.parent.relative_to(root).as_posix()}/{file.stem}.{asset.digest[:12]}{file.suffix}"
+            fingerprinted = fingerprinted.removeprefix("./")
+            self._assets[path] = asset
+            self._urls[path] = f"{self.prefix}/{fingerprinted}"
+
+    def url(self, path: str) -> str:
+        """Return the fingerprinted URL of an asset (plain URL if unknown)."""
+        return self._urls.get(path, f"{self.prefix}/{path}")
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path = path.lstrip("/")
+        request = Request(scope)
+
+        match = _FINGERPRINT.match(path)
+        if match:
+            plain = f"{match['stem']}{match['suffix']}"
+            asset = self._assets.get(plain)
+            if asset is not None and asset.digest.startswith(match["hash"]):
+                return asset.response(request.headers, IMMUTABLE_CACHE_CONTROL)
+
+        asset = self._assets.get(path)
+        if asset is not None:
+            return asset.response(request.headers, REVALIDATE_CACHE_CONTROL)
+
+        return await super().get_response(path, scope)
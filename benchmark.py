@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for contract generation.
+
+Measures PDF generation (cold vs. warm, short vs. long values, single vs.
+batch), placeholder extraction and the /submit-contract path through the
+ASGI test client. Google Sheets and Gmail use the app's fake backends
+(app/backends.py), so no credentials or network access are needed.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --iterations 100 --output bench.json
+    python benchmark.py --only pdf_warm_short,submit --sheets-latency 0.2
+    python benchmark.py --only submit --gmail-quota 60 --error-rate 0.05
+
+Results are written as JSON (latency percentiles and throughput per
+benchmark) so runs can be compared across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+TEMPLATE_PATH = "crm.eaea.ro Draft - Contract prestari servicii Early Alpha.docx (1).pdf"
+
+# Same record as test_pdf_replacement.py
+SHORT_DATA = {
+    "no": "001/2025",
+    "date": "24.10.2025",
+    "contact_first_name": "Ion",
+    "contact_last_name": "Popescu",
+    "contact_address": "Str. Exemplu nr. 123, Sector 1, București",
+    "contact_phone": "+40 712 345 678",
+    "contact_email": "ion.popescu@example.com",
+    "contact_id_series": "RO",
+    "contact_id_no": "123456",
+    "contact_personal_no": "1234567890123",
+    "contact_emergency_first_name": "Maria",
+    "contact_emergency_last_name": "Popescu",
+    "contact_emergency_phone_no": "+40 712 345 679",
+    "student_first_name": "Mihai",
+    "student_last_name": "Popescu",
+    "student_birth_date": "15.03.2015",
+    "if_14_student_first_name": "",
+    "if_14_student_last_name": "",
+    "if_14_date": "",
+    "subscriptions_types": "Robotică Avansată\nProgramare Python\nElectronică și IoT",
+    "timeslots": "Marți: 17:00-18:30\nJoi: 17:00-18:30\nSâmbătă: 10:00-12:00"
+}
+
+# Values that need wrapping and shrinking to fit their boxes
+LONG_DATA = {
+    **SHORT_DATA,
+    "contact_address": (
+        "Bd. Mareșal Alexandru Averescu nr. 127, bl. C4, sc. B, et. 7, ap. 42, "
+        "Sector 1, București, cod poștal 011456"
+    ),
+    "subscriptions_types": "\n".join([
+        "Robotică Avansată - abonament 16 ședințe",
+        "Programare Python pentru începători și avansați - abonament 8 ședințe",
+        "Electronică și IoT",
+        "Matematică aplicată"
+    ]),
+    "timeslots": "\n".join([
+        "Luni: 16:00-17:30", "Marți: 17:00-18:30", "Miercuri: 16:00-17:30",
+        "Joi: 17:00-18:30", "Sâmbătă: 10:00-12:00"
+    ])
+}
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float], wall_seconds: Optional[float] = None, items: Optional[int] = None) -> Dict[str, Any]:
+    """Latency percentiles (milliseconds) and throughput for a benchmark."""
+    values = sorted(samples)
+    wall_seconds = wall_seconds if wall_seconds is not None else sum(values)
+    items = items if items is not None else len(values)
+    return {
+        "n": len(values),
+        "mean_ms": round(1000 * sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 0.50), 3),
+        "p95_ms": round(1000 * percentile(values, 0.95), 3),
+        "p99_ms": round(1000 * percentile(values, 0.99), 3),
+        "min_ms": round(1000 * values[0], 3) if values else 0.0,
+        "max_ms": round(1000 * values[-1], 3) if values else 0.0,
+        "throughput_per_s": round(items / wall_seconds, 3) if wall_seconds > 0 else 0.0
+    }
+
+
+def timed(func: Callable, iterations: int) -> Dict[str, Any]:
+    """Run func() `iterations` times and summarize the latencies."""
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_pdf_cold(workdir: Path, iterations: int) -> Dict[str, Any]:
+    """First contract from a fresh handler with empty template caches."""
+    from app.pdf_handler import PDFHandler
+
+    def run():
+        PDFHandler._layout_cache.clear()
+        PDFHandler._blank_cache.clear()
+        PDFHandler(TEMPLATE_PATH).generate_pdf(SHORT_DATA, str(workdir / "cold.pdf"))
+
+    return timed(run, iterations)
+
+
+def bench_pdf_warm(workdir: Path, iterations: int, data: Dict[str, str]) -> Dict[str, Any]:
+    """Repeated contracts from one warmed-up handler."""
+    from app.pdf_handler import PDFHandler
+
+    handler = PDFHandler(TEMPLATE_PATH)
+    handler.generate_pdf(data, str(workdir / "warm.pdf"))
+    return timed(lambda: handler.generate_pdf(data, str(workdir / "warm.pdf")), iterations)
+
+
+def bench_pdf_batch(workdir: Path, iterations: int, workers: int) -> Dict[str, Any]:
+    """Throughput of app.batch over a process pool (includes pool start-up)."""
+    from app.batch import generate_batch
+
+    records = [{**SHORT_DATA, "no": f"{index + 1:03d}/2025"} for index in range(iterations)]
+    report = generate_batch(records, output_folder=str(workdir / "batch"), workers=workers,
+                            template_path=TEMPLATE_PATH)
+    result = summarize([r["seconds"] for r in report["results"]], report["seconds"], report["succeeded"])
+    result["workers"] = report["workers"]
+    result["failed"] = report["failed"]
+    return result
+
+
+def bench_placeholders(iterations: int) -> Dict[str, Any]:
+    """Placeholder extraction from the template."""
+    from app.pdf_handler import PDFHandler
+
+    return timed(lambda: PDFHandler.get_placeholders_from_pdf(TEMPLATE_PATH), iterations)
+
+
+def bench_submit(iterations: int) -> Dict[str, Any]:
+    """POST /submit-contract through the ASGI test client.
+
+    Google Sheets and Gmail use the app's fake backends (configured through
+    the environment in main()). Reports the latency until the 202 response
+    ("accept") and until the job is completed ("complete", render + Sheets
+    + email queued), plus the fake Gmail send counters.
+    """
+    from fastapi.testclient import TestClient
+    from app import main
+
+    accept, complete = [], []
+    with TestClient(main.app) as client:
+        started = time.perf_counter()
+        for index in range(iterations):
+            data = {**SHORT_DATA, "no": f"{index + 1:03d}/2025"}
+            call_started = time.perf_counter()
+            response = client.post("/submit-contract", data=data)
+            accept.append(time.perf_counter() - call_started)
+
+            job_id = response.json()["job_id"]
+            while client.get(f"/jobs/{job_id}").json()["status"] not in ("completed", "failed"):
+                time.sleep(0.002)
+            complete.append(time.perf_counter() - call_started)
+        wall = time.perf_counter() - started
+
+        # Let the mail queue drain before reading the send counters
+        deadline = time.monotonic() + 30
+        while main.mail_queue.depth() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        gmail = main.email_service.get_metrics()
+
+    return {
+        "accept": summarize(accept, wall),
+        "complete": summarize(complete, wall),
+        "gmail": gmail
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Current commit hash, if run inside the git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+BENCHMARKS = [
+    "pdf_cold", "pdf_warm_short", "pdf_warm_long", "pdf_batch", "placeholders", "submit"
+]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the selected benchmarks and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark contract generation.")
+    parser.add_argument("--iterations", type=int, default=30, help="Iterations per benchmark")
+    parser.add_argument("--cold-iterations", type=int, default=5, help="Iterations of the cold benchmark")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Batch worker processes")
+    parser.add_argument("--only", default=None, help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--sheets-latency", type=float, default=0.0, help="Fake Sheets call latency (s)")
+    parser.add_argument("--gmail-latency", type=float, default=0.0, help="Fake Gmail send latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake backend error rate (0-1)")
+    parser.add_argument("--sheets-quota", type=int, default=0, help="Fake Sheets calls per minute (0 = unlimited)")
+    parser.add_argument("--gmail-quota", type=int, default=0, help="Fake Gmail sends per minute (0 = unlimited)")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="contract-bench-"))
+
+    # Keep the app's state and output out of the working tree and use the
+    # fake Google backends; must be set before app.config loads
+    os.environ.update({
+        "OUTPUT_FOLDER": str(workdir / "output"),
+        "JOBS_DB_PATH": str(workdir / "jobs.db"),
+        "MAIL_QUEUE_DB_PATH": str(workdir / "mail_queue.db"),
+        "ARCHIVE_DB_PATH": str(workdir / "archive.db"),
+        "CONTRACT_NUMBERS_DB_PATH": str(workdir / "contract_numbers.db"),
+        "SHEET_MIRROR_DB_PATH": str(workdir / "sheet_mirror.db"),
+        "SHEETS_SPILL_FILE": str(workdir / "sheets_spill.jsonl"),
+        "SHEETS_BACKEND": "fake",
+        "GMAIL_BACKEND": "fake",
+        "FAKE_SHEETS_LATENCY": str(args.sheets_latency),
+        "FAKE_GMAIL_LATENCY": str(args.gmail_latency),
+        "FAKE_ERROR_RATE": str(args.error_rate),
+        "FAKE_SHEETS_QUOTA_PER_MINUTE": str(args.sheets_quota),
+        "FAKE_GMAIL_QUOTA_PER_MINUTE": str(args.gmail_quota),
+        "EMAIL_RATE_PER_SECOND": "0",
+        "EMAIL_RETRY_BASE_DELAY": "0.05",
+        "LOG_LEVEL": "WARNING",
+    })
+
+    results: Dict[str, Any] = {}
+    runners = {
+        "pdf_cold": lambda: bench_pdf_cold(workdir, args.cold_iterations),
+        "pdf_warm_short": lambda: bench_pdf_warm(workdir, args.iterations, SHORT_DATA),
+        "pdf_warm_long": lambda: bench_pdf_warm(workdir, args.iterations, LONG_DATA),
+        "pdf_batch": lambda: bench_pdf_batch(workdir, args.iterations, args.workers),
+        "placeholders": lambda: bench_placeholders(args.iterations),
+        "submit": lambda: bench_submit(args.iterations),
+    }
+
+    for name in BENCHMARKS:
+        if name not in selected:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = runners[name]()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "sheets_latency": args.sheets_latency,
+            "gmail_latency": args.gmail_latency,
+            "error_rate": args.error_rate,
+            "sheets_quota": args.sheets_quota,
+            "gmail_quota": args.gmail_quota
+        },
+        "results": results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
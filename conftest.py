@@ -0,0 +1,104 @@
+"""Shared test fixtures."""
+import pytest
+
+from app.backends import FakeConditions, FakeSheetsBackend
+from app.sheet_mirror import SheetMirror
+from app.sheets_service import SheetsService
+
+
+# A typical contract record
+SHORT_DATA = {
+    "no": "001/2025",
+    "date": "24.10.2025",
+    "contact_first_name": "Ion",
+    "contact_last_name": "Popescu",
+    "contact_address": "Str. Exemplu nr. 123, Sector 1, București",
+    "contact_phone": "+40 712 345 678",
+    "contact_email": "ion.popescu@example.com",
+    "contact_id_series": "RO",
+    "contact_id_no": "123456",
+    "contact_personal_no": "1234567890123",
+    "contact_emergency_first_name": "Maria",
+    "contact_emergency_last_name": "Popescu",
+    "contact_emergency_phone_no": "+40 712 345 679",
+    "student_first_name": "Mihai",
+    "student_last_name": "Popescu",
+    "student_birth_date": "15.03.2015",
+    "if_14_student_first_name": "",
+    "if_14_student_last_name": "",
+    "if_14_date": "",
+    "subscriptions_types": "Robotică Avansată\nProgramare Python\nElectronică și IoT",
+    "timeslots": "Marți: 17:00-18:30\nJoi: 17:00-18:30\nSâmbătă: 10:00-12:00"
+}
+
+# Values that need wrapping and shrinking to fit their boxes
+LONG_DATA = {
+    **SHORT_DATA,
+    "contact_address": (
+        "Bd. Mareșal Alexandru Averescu nr. 127, bl. C4, sc. B, et. 7, ap. 42, "
+        "Sector 1, București, cod poștal 011456"
+    ),
+    "subscriptions_types": "\n".join([
+        "Robotică Avansată - abonament 16 ședințe",
+        "Programare Python pentru începători și avansați - abonament 8 ședințe",
+        "Electronică și IoT",
+        "Matematică aplicată"
+    ]),
+    "timeslots": "\n".join([
+        "Luni: 16:00-17:30", "Marți: 17:00-18:30", "Miercuri: 16:00-17:30",
+        "Joi: 17:00-18:30", "Sâmbătă: 10:00-12:00"
+    ])
+}
+
+
+@pytest.fixture
+def short_data():
+    return dict(SHORT_DATA)
+
+
+@pytest.fixture
+def long_data():
+    return dict(LONG_DATA)
+
+
+@pytest.fixture
+def sheets_backend():
+    return FakeSheetsBackend(FakeConditions())
+
+
+@pytest.fixture
+def make_sheets(tmp_path, sheets_backend):
+    """Build SheetsServices on the fake backend, sharing one spill file.
+
+    A second service built in the same test acts as the first one after a
+    restart. All of them are closed at the end of the test.
+    """
+    services = []
+
+    def make():
+        # A long interval keeps the background flusher out of the way
+        service = SheetsService(
+            "unused.json", "test-sheet",
+            flush_max_rows=100, flush_interval=3600,
+            spill_file=str(tmp_path / "spill.jsonl"),
+            backend=sheets_backend
+        )
+        service.ensure_headers()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+
+@pytest.fixture
+def sheets(make_sheets):
+    return make_sheets()
+
+
+@pytest.fixture
+def mirror(tmp_path, sheets):
+    mirror = SheetMirror(sheets, str(tmp_path / "mirror.db"))
+    yield mirror
+    mirror.close()
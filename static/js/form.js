@@ -0,0 +1,473 @@
+// Token of the contract number reserved for this form; the reservation is
+// given back when a new number is fetched and ends when the form is submitted
+let reservationToken = null;
+
+// Fetch next contract number from API
+async function fetchNextContractNumber() {
+    const contractNoInput = document.getElementById('no');
+    const refreshBtn = document.getElementById('refreshContractNo');
+
+    try {
+        // Show loading state
+        contractNoInput.placeholder = 'Se încarcă...';
+        contractNoInput.disabled = true;
+        if (refreshBtn) refreshBtn.disabled = true;
+
+        const url = reservationToken
+            ? `/api/next-contract-number?release_token=${encodeURIComponent(reservationToken)}`
+            : '/api/next-contract-number';
+        const response = await fetch(url);
+        const data = await response.json();
+
+        if (data.success && data.contract_number) {
+            reservationToken = data.reservation_token;
+            contractNoInput.value = data.contract_number;
+            // A new contract number makes this a new submission
+            idempotencyKey = newIdempotencyKey();
+            contractNoInput.placeholder = '';
+            console.log('✅ Contract number loaded:', data.contract_number);
+        } else {
+            // Fallback
+            contractNoInput.value = data.contract_number || '001/2025';
+            console.warn('⚠️ Using fallback contract number');
+        }
+    } catch (error) {
+        console.error('❌ Error fetching contract number:', error);
+        // Use fallback
+        const year = new Date().getFullYear();
+        contractNoInput.value = `001/${year}`;
+        contractNoInput.placeholder = '';
+    } finally {
+        contractNoInput.disabled = false;
+        if (refreshBtn) refreshBtn.disabled = false;
+    }
+}
+
+// Toggle emergency contact fields (same as contact or different)
+function toggleEmergencyContact() {
+    const checkbox = document.getElementById('sameAsContact');
+    const emergencyFirstName = document.getElementById('contact_emergency_first_name');
+    const emergencyLastName = document.getElementById('contact_emergency_last_name');
+    const emergencyPhone = document.getElementById('contact_emergency_phone_no');
+    const emergencyFields = document.getElementById('emergencyContactFields');
+
+    if (checkbox.checked) {
+        // Copy data from contact fields
+        emergencyFirstName.value = document.getElementById('contact_first_name').value;
+        emergencyLastName.value = document.getElementById('contact_last_name').value;
+        emergencyPhone.value = document.getElementById('contact_phone').value;
+
+        // Disable and style fields
+        emergencyFirstName.disabled = true;
+        emergencyLastName.disabled = true;
+        emergencyPhone.disabled = true;
+        emergencyFields.style.opacity = '0.6';
+
+        // Add auto-filled class for visual feedback
+        emergencyFirstName.classList.add('auto-filled');
+        emergencyLastName.classList.add('auto-filled');
+        emergencyPhone.classList.add('auto-filled');
+    } else {
+        // Enable fields for manual input
+        emergencyFirstName.disabled = false;
+        emergencyLastName.disabled = false;
+        emergencyPhone.disabled = false;
+        emergencyFields.style.opacity = '1';
+
+        // Remove auto-filled class
+        emergencyFirstName.classList.remove('auto-filled');
+        emergencyLastName.classList.remove('auto-filled');
+        emergencyPhone.classList.remove('auto-filled');
+
+        // Don't clear values - let user decide
+    }
+}
+
+// Also update emergency contact when contact fields change (if checkbox is checked)
+function updateEmergencyIfSame() {
+    const checkbox = document.getElementById('sameAsContact');
+    if (checkbox && checkbox.checked) {
+        toggleEmergencyContact(); // Re-copy the data
+    }
+}
+
+// Add listeners to contact fields
+document.addEventListener('DOMContentLoaded', function() {
+    const contactFirstName = document.getElementById('contact_first_name');
+    const contactLastName = document.getElementById('contact_last_name');
+    const contactPhone = document.getElementById('contact_phone');
+
+    if (contactFirstName) contactFirstName.addEventListener('input', updateEmergencyIfSame);
+    if (contactLastName) contactLastName.addEventListener('input', updateEmergencyIfSame);
+    if (contactPhone) contactPhone.addEventListener('input', updateEmergencyIfSame);
+});
+
+// Load contract number and set date on page load
+document.addEventListener('DOMContentLoaded', function() {
+    fetchNextContractNumber();
+    // Set default date to today
+    document.getElementById('date').valueAsDate = new Date();
+});
+
+// Refresh button click handler
+document.getElementById('refreshContractNo')?.addEventListener('click', function() {
+    fetchNextContractNumber();
+});
+
+// Fill form with demo data for testing
+async function fillDemoData() {
+    const demoAdult = confirm('Doriți date pentru student ADULT (14+ ani)?\n\nOK = Adult (16 ani)\nCancel = Minor (12 ani)');
+
+    // Get today's date for contract
+    const today = new Date();
+    const contractDate = today.toISOString().split('T')[0];
+
+    // Fetch next contract number (don't use DEMO prefix)
+    await fetchNextContractNumber();
+    document.getElementById('date').value = contractDate;
+
+    if (demoAdult) {
+        // ADULT STUDENT (16 years old)
+        const birthYear = today.getFullYear() - 16;
+        const studentBirthDate = `${birthYear}-03-15`;
+
+        // Student info (will auto-fill contact)
+        document.getElementById('student_first_name').value = 'Ion';
+        document.getElementById('student_last_name').value = 'Popescu';
+        document.getElementById('student_birth_date').value = studentBirthDate;
+
+        // Trigger age calculation (this will auto-fill contact name)
+        handleAgeChange();
+
+        // Contact details (additional info)
+        document.getElementById('contact_address').value = 'Str. Exemplu nr. 123, Sector 1, București';
+        document.getElementById('contact_phone').value = '+40 712 345 678';
+        document.getElementById('contact_email').value = 'ion.popescu@example.com';
+        document.getElementById('contact_id_series').value = 'RO';
+        document.getElementById('contact_id_no').value = '123456';
+        document.getElementById('contact_personal_no').value = '1990315123456';
+
+        // Emergency contact (different person)
+        document.getElementById('sameAsContact').checked = false;
+        toggleEmergencyContact(); // Ensure fields are enabled
+        document.getElementById('contact_emergency_first_name').value = 'Maria';
+        document.getElementById('contact_emergency_last_name').value = 'Popescu';
+        document.getElementById('contact_emergency_phone_no').value = '+40 712 345 679';
+
+        // Under 14 fields will be auto-cleared by age calculation
+    } else {
+        // MINOR STUDENT (12 years old)
+        const birthYear = today.getFullYear() - 12;
+        const studentBirthDate = `${birthYear}-08-20`;
+
+        // Student info
+        document.getElementById('student_first_name').value = 'Maria';
+        document.getElementById('student_last_name').value = 'Ionescu';
+        document.getElementById('student_birth_date').value = studentBirthDate;
+
+        // Trigger age calculation (will show under 14 section)
+        handleAgeChange();
+
+        // Contact person (PARENT/GUARDIAN - different from student)
+        document.getElementById('contact_first_name').value = 'Ana';
+        document.getElementById('contact_last_name').value = 'Ionescu';
+        document.getElementById('contact_address').value = 'Str. Demo nr. 456, Sector 2, București';
+        document.getElementById('contact_phone').value = '+40 722 111 222';
+        document.getElementById('contact_email').value = 'ana.ionescu@example.com';
+        document.getElementById('contact_id_series').value = 'AB';
+        document.getElementById('contact_id_no').value = '654321';
+        document.getElementById('contact_personal_no').value = '2850820123456';
+
+        // Emergency contact (different person)
+        document.getElementById('sameAsContact').checked = false;
+        toggleEmergencyContact(); // Ensure fields are enabled
+        document.getElementById('contact_emergency_first_name').value = 'Mihai';
+        document.getElementById('contact_emergency_last_name').value = 'Ionescu';
+        document.getElementById('contact_emergency_phone_no').value = '+40 722 333 444';
+
+        // Under 14 fields auto-filled by age calculation
+    }
+
+    // Course details (same for both)
+    document.getElementById('subscriptions_types').value = 'Robotică Avansată\nProgramare Python\nElectronică și IoT';
+    document.getElementById('timeslots').value = 'Marți: 17:00-18:30\nJoi: 17:00-18:30\nSâmbătă: 10:00-12:00';
+
+    // Show success message
+    const alertContainer = document.getElementById('alertContainer');
+    const contractNo = document.getElementById('no').value;
+    alertContainer.innerHTML = `
+        <div class="alert alert-info alert-dismissible fade show" role="alert">
+            <i class="bi bi-lightning-charge-fill"></i>
+            <strong>Date Demo Încărcate!</strong> Formularul a fost completat cu date de test.
+            Număr contract: <strong>${contractNo}</strong> (din Excel).
+            ${demoAdult ? 'Student adult (16 ani) - nume contact auto-completat.' : 'Student minor (12 ani) - secțiunea sub 14 ani vizibilă.'}
+            <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+        </div>
+    `;
+
+    // Scroll to top
+    window.scrollTo({ top: 0, behavior: 'smooth' });
+}
+
+// Calculate age from birth date
+function calculateAge(birthDate) {
+    const today = new Date();
+    const birth = new Date(birthDate);
+    let age = today.getFullYear() - birth.getFullYear();
+    const monthDiff = today.getMonth() - birth.getMonth();
+
+    if (monthDiff < 0 || (monthDiff === 0 && today.getDate() < birth.getDate())) {
+        age--;
+    }
+
+    return age;
+}
+
+// Auto-fill contact fields if student is 14+
+function handleAgeChange() {
+    const birthDate = document.getElementById('student_birth_date').value;
+    const studentFirstName = document.getElementById('student_first_name').value;
+    const studentLastName = document.getElementById('student_last_name').value;
+
+    if (!birthDate) return;
+
+    const age = calculateAge(birthDate);
+    const ageIndicator = document.getElementById('ageIndicator');
+    const autoFillNotice = document.getElementById('autoFillNotice');
+    const under14Section = document.getElementById('under14Section');
+
+    // Show age indicator
+    ageIndicator.style.display = 'inline-block';
+    ageIndicator.textContent = `Vârstă: ${age} ani`;
+
+    if (age >= 14) {
+        // Adult student - auto-fill contact fields
+        ageIndicator.className = 'age-indicator age-adult';
+
+        // Only auto-fill if student name is provided
+        if (studentFirstName && studentLastName) {
+            const contactFirstName = document.getElementById('contact_first_name');
+            const contactLastName = document.getElementById('contact_last_name');
+
+            // Auto-fill only if contact fields are empty
+            if (!contactFirstName.value || contactFirstName.classList.contains('auto-filled')) {
+                contactFirstName.value = studentFirstName;
+                contactFirstName.classList.add('auto-filled');
+            }
+            if (!contactLastName.value || contactLastName.classList.contains('auto-filled')) {
+                contactLastName.value = studentLastName;
+                contactLastName.classList.add('auto-filled');
+            }
+
+            autoFillNotice.style.display = 'block';
+        }
+
+        // Hide under 14 section and clear values
+        under14Section.classList.add('section-collapsed');
+        document.getElementById('if_14_student_first_name').value = '';
+        document.getElementById('if_14_student_last_name').value = '';
+        document.getElementById('if_14_date').value = '';
+    } else {
+        // Minor student - show under 14 section
+        ageIndicator.className = 'age-indicator age-minor';
+        autoFillNotice.style.display = 'none';
+        under14Section.classList.remove('section-collapsed');
+
+        // Remove auto-filled class and don't clear contact fields
+        // (parent/guardian info should be different)
+        document.getElementById('contact_first_name').classList.remove('auto-filled');
+        document.getElementById('contact_last_name').classList.remove('auto-filled');
+
+        // Auto-fill under 14 section with student name
+        if (studentFirstName && studentLastName) {
+            document.getElementById('if_14_student_first_name').value = studentFirstName;
+            document.getElementById('if_14_student_last_name').value = studentLastName;
+            document.getElementById('if_14_date').value = document.getElementById('date').value;
+        }
+    }
+}
+
+// Remove auto-filled styling when user manually edits
+function removeAutoFilledClass(fieldId) {
+    document.getElementById(fieldId).addEventListener('input', function() {
+        this.classList.remove('auto-filled');
+    });
+}
+
+removeAutoFilledClass('contact_first_name');
+removeAutoFilledClass('contact_last_name');
+
+// Listen for changes
+document.getElementById('student_birth_date').addEventListener('change', handleAgeChange);
+document.getElementById('student_first_name').addEventListener('input', handleAgeChange);
+document.getElementById('student_last_name').addEventListener('input', handleAgeChange);
+
+// Poll a submission job until it completes or fails
+async function pollJob(jobId) {
+    const stageLabels = {
+        render: 'Se generează PDF-ul...',
+        persist: 'Se salvează în Google Sheets...',
+        email: 'Se trimite emailul...'
+    };
+
+    while (true) {
+        const response = await fetch(`/jobs/${jobId}`);
+        if (!response.ok) {
+            // Unknown job or server error: stop polling and report it
+            return {
+                success: false,
+                message: `Nu s-a putut afla starea contractului (HTTP ${response.status}).`
+            };
+        }
+        const job = await response.json();
+
+        if (job.status === 'completed' || job.status === 'failed') {
+            return job;
+        }
+
+        document.getElementById('alertContainer').innerHTML = `
+            <div class="alert alert-info" role="alert">
+                <i class="bi bi-hourglass-split"></i>
+                ${stageLabels[job.stage] || 'Contractul este în așteptare...'}
+            </div>
+        `;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+// Retry a failed submission from the stage that failed
+async function retryJob(jobId) {
+    const alertContainer = document.getElementById('alertContainer');
+    const response = await fetch(`/jobs/${jobId}/retry`, { method: 'POST' });
+
+    if (!response.ok) {
+        return;
+    }
+
+    const result = await pollJob(jobId);
+    const alertClass = result.success ? 'alert-success' : 'alert-danger';
+    alertContainer.innerHTML = `
+        <div class="alert ${alertClass} alert-dismissible fade show" role="alert">
+            <strong>${result.success ? 'Succes!' : 'Eroare!'}</strong> ${result.message}
+            <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+        </div>
+    `;
+}
+
+// One key per filled-in form, so resubmitting it is not processed twice
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+let idempotencyKey = newIdempotencyKey();
+
+// Changed form data is a new submission and needs its own key
+['input', 'change'].forEach(type => {
+    document.getElementById('contractForm').addEventListener(type, function() {
+        idempotencyKey = newIdempotencyKey();
+    });
+});
+
+// Form submission
+document.getElementById('contractForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const submitBtn = document.getElementById('submitBtn');
+    const loadingSpinner = document.getElementById('loadingSpinner');
+    const alertContainer = document.getElementById('alertContainer');
+
+    // Show loading state
+    submitBtn.disabled = true;
+    loadingSpinner.style.display = 'block';
+    alertContainer.innerHTML = '';
+
+    // Temporarily enable emergency fields if disabled (so they get submitted)
+    const emergencyFirstName = document.getElementById('contact_emergency_first_name');
+    const emergencyLastName = document.getElementById('contact_emergency_last_name');
+    const emergencyPhone = document.getElementById('contact_emergency_phone_no');
+    const wasDisabled = emergencyFirstName.disabled;
+
+    if (wasDisabled) {
+        emergencyFirstName.disabled = false;
+        emergencyLastName.disabled = false;
+        emergencyPhone.disabled = false;
+    }
+
+    try {
+        const formData = new FormData(this);
+        if (reservationToken) {
+            formData.append('reservation_token', reservationToken);
+        }
+
+        // Re-disable if they were disabled
+        if (wasDisabled) {
+            emergencyFirstName.disabled = true;
+            emergencyLastName.disabled = true;
+            emergencyPhone.disabled = true;
+        }
+        const response = await fetch('/submit-contract', {
+            method: 'POST',
+            headers: { 'Idempotency-Key': idempotencyKey },
+            body: formData
+        });
+
+        const submission = await response.json();
+
+        // The server queues the contract; poll until it is processed
+        const result = submission.success ? await pollJob(submission.job_id) : submission;
+
+        if (result.success) {
+            alertContainer.innerHTML = `
+                <div class="alert alert-success alert-dismissible fade show" role="alert">
+                    <i class="bi bi-check-circle-fill"></i>
+                    <strong>Succes!</strong> ${result.message}
+                    <br><small>
+                        PDF generat: ${result.pdf_generated ? '✓' : '✗'} | 
+                        Salvat în Google Sheets: ${result.sheets_saved ? '✓' : '✗'} | 
+                        Email trimis: ${result.email_sent ? '✓' : (result.email_status === 'queued' || result.email_status === 'sending' ? 'în curs' : '✗')}
+                    </small>
+                    ${result.pdf_url ? `<br><a href="${result.pdf_url}" class="alert-link"><i class="bi bi-download"></i> Descarcă contractul</a>` : ''}
+                    <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                </div>
+            `;
+            // Reset form
+            this.reset();
+            idempotencyKey = newIdempotencyKey();
+            // Reset emergency contact checkbox and fields
+            document.getElementById('sameAsContact').checked = false;
+            toggleEmergencyContact();
+            // The held number is now used; reserve a new one for the next submission
+            reservationToken = null;
+            fetchNextContractNumber();
+            document.getElementById('date').valueAsDate = new Date();
+        } else {
+            // The form may be corrected and sent again as a new submission
+            idempotencyKey = newIdempotencyKey();
+            alertContainer.innerHTML = `
+                <div class="alert alert-danger alert-dismissible fade show" role="alert">
+                    <i class="bi bi-exclamation-triangle-fill"></i>
+                    <strong>Eroare!</strong> ${result.message}
+                    ${result.job_id ? `<button type="button" class="btn btn-sm btn-outline-danger ms-2" onclick="retryJob('${result.job_id}')">Reîncearcă</button>` : ''}
+                    <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                </div>
+            `;
+        }
+    } catch (error) {
+        alertContainer.innerHTML = `
+            <div class="alert alert-danger alert-dismissible fade show" role="alert">
+                <i class="bi bi-exclamation-triangle-fill"></i>
+                <strong>Eroare!</strong> A apărut o eroare la trimiterea formularului.
+                <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+            </div>
+        `;
+    } finally {
+        // Hide loading state
+        submitBtn.disabled = false;
+        loadingSpinner.style.display = 'none';
+
+        // Scroll to top to see the alert
+        window.scrollTo({ top: 0, behavior: 'smooth' });
+    }
+});
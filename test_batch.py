@@ -0,0 +1,12 @@
+"""Tests for batch contract generation."""
+from app.batch import generate_batch
+
+
+def test_report_shows_the_pool_size_used(tmp_path, short_data):
+    invalid = {**short_data, "contact_email": "not an email"}
+    report = generate_batch([short_data, invalid], output_folder=str(tmp_path), workers=8)
+
+    assert report["succeeded"] == 1
+    assert report["failed"] == 1
+    # One valid record needs one process, whatever was asked for
+    assert report["workers"] == 1
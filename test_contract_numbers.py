@@ -0,0 +1,90 @@
+"""Tests for contract number reservation (fake Sheets backend)."""
+from datetime import datetime
+
+from app.contract_numbers import ContractNumberAllocator
+
+
+YEAR = datetime.now().year
+
+
+def make_allocator(tmp_path, mirror, **options):
+    return ContractNumberAllocator(mirror, str(tmp_path / "contract_numbers.db"), **options)
+
+
+def next_number(allocator):
+    contract_no, _ = allocator.reserve()
+    return contract_no
+
+
+def test_reservations_hand_out_distinct_numbers(tmp_path, mirror):
+    allocator = make_allocator(tmp_path, mirror)
+    first, first_token = allocator.reserve()
+    second, second_token = allocator.reserve()
+    assert (first, second) == (f"001/{YEAR}", f"002/{YEAR}")
+    assert first_token != second_token
+    allocator.close()
+
+
+def test_numbers_in_the_sheet_are_skipped(tmp_path, sheets, mirror):
+    sheets.append_submission({"no": f"041/{YEAR}"})
+    assert sheets.buffer.flush()
+    mirror.sync()
+
+    allocator = make_allocator(tmp_path, mirror)
+    assert next_number(allocator) == f"042/{YEAR}"
+    allocator.close()
+
+
+def test_buffered_rows_count_as_used(tmp_path, sheets, mirror):
+    allocator = make_allocator(tmp_path, mirror)
+    sheets.append_submission({"no": f"007/{YEAR}"})
+    assert next_number(allocator) == f"008/{YEAR}"
+    allocator.close()
+
+
+def test_commit_raises_the_counter(tmp_path, mirror):
+    allocator = make_allocator(tmp_path, mirror)
+    first, first_token = allocator.reserve()
+    second, second_token = allocator.reserve()
+    allocator.commit(second, second_token)
+    allocator.commit(first, first_token)
+    assert next_number(allocator) == f"003/{YEAR}"
+    allocator.close()
+
+    # The counter and the reservation of 003 survive a restart
+    restarted = make_allocator(tmp_path, mirror)
+    assert next_number(restarted) == f"004/{YEAR}"
+    restarted.close()
+
+
+def test_released_number_is_reserved_again(tmp_path, mirror):
+    allocator = make_allocator(tmp_path, mirror)
+    held, token = allocator.reserve()
+    assert allocator.release(token)
+    assert next_number(allocator) == held
+    allocator.close()
+
+
+def test_release_without_the_token_is_ignored(tmp_path, mirror):
+    allocator = make_allocator(tmp_path, mirror)
+    held, token = allocator.reserve()
+
+    # Neither the number nor someone else's token frees the reservation
+    assert not allocator.release(held)
+    _, other_token = allocator.reserve()
+    assert not allocator.release("not-a-token")
+    assert next_number(allocator) == f"003/{YEAR}"
+
+    # Committing with the token ends the reservation for good
+    allocator.commit(held, token)
+    assert not allocator.release(token)
+    assert allocator.release(other_token)
+    assert next_number(allocator) == f"002/{YEAR}"
+    allocator.close()
+
+
+def test_expired_reservations_are_reused(tmp_path, mirror):
+    allocator = make_allocator(tmp_path, mirror, reservation_ttl=-1)
+    assert next_number(allocator) == f"001/{YEAR}"
+    assert next_number(allocator) == f"001/{YEAR}"
+    allocator.close()
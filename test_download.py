@@ -0,0 +1,55 @@
+"""Tests for downloading a submission's contract PDF."""
+from urllib.parse import unquote
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    """The app, with fake backends and its databases in a temporary folder."""
+    folder = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for name, value in {
+            "sheets_backend": "fake",
+            "gmail_backend": "fake",
+            "output_folder": str(folder / "output"),
+            "jobs_db_path": str(folder / "jobs.db"),
+            "mail_queue_db_path": str(folder / "mail_queue.db"),
+            "archive_db_path": str(folder / "archive.db"),
+            "sheet_mirror_db_path": str(folder / "sheet_mirror.db"),
+            "contract_numbers_db_path": str(folder / "contract_numbers.db"),
+            "sheets_spill_file": str(folder / "sheets_spill.jsonl"),
+        }.items():
+            monkeypatch.setattr(settings, name, value)
+
+        from app import main
+        yield main
+
+
+def completed_job(main, data, archived):
+    """Journal a rendered job, with its PDF in the archive or not."""
+    pdf_bytes = main.render_contract(data)
+    digest = main.contract_digest(pdf_bytes)
+    if archived:
+        main.contract_archive.store(pdf_bytes, data, digest)
+    job_id = main.job_store.create({"data": data}, "done")
+    main.job_store.update(job_id, status="completed", result={"pdf_generated": True, "pdf_sha256": digest})
+    return job_id, pdf_bytes
+
+
+@pytest.mark.parametrize("archived", [True, False])
+def test_download_name_keeps_diacritics(main, short_data, archived):
+    data = {**short_data, "student_first_name": "Ștefan", "student_last_name": "Țăranu"}
+    job_id, pdf_bytes = completed_job(main, data, archived)
+
+    response = TestClient(main.app).get(f"/jobs/{job_id}/pdf")
+
+    assert response.status_code == 200
+    assert response.content == pdf_bytes
+    disposition = response.headers["content-disposition"]
+    assert disposition.startswith('attachment; filename="contract_Taranu_Stefan_001-2025.pdf"; ')
+    encoded = disposition.split("filename*=UTF-8''", 1)[1]
+    assert unquote(encoded) == "contract_Țăranu_Ștefan_001-2025.pdf"
@@ -0,0 +1,60 @@
+"""Tests for deduplicating repeated submissions."""
+import time
+
+import pytest
+
+from app.idempotency import IdempotencyKeyConflict, SubmissionCache, TTLCache, canonical_hash
+
+
+DATA = {"no": "001/2026", "student_first_name": "Mihai", "student_last_name": "Popescu"}
+
+
+def test_hash_ignores_key_order():
+    reordered = dict(reversed(list(DATA.items())))
+    assert canonical_hash(reordered) == canonical_hash(DATA)
+    assert canonical_hash({**DATA, "no": "002/2026"}) != canonical_hash(DATA)
+
+
+def test_repeated_submission_finds_the_first_job():
+    cache = SubmissionCache()
+    data_hash = canonical_hash(DATA)
+    assert cache.lookup(data_hash, "key-1") is None
+    cache.remember(data_hash, "job-1", "key-1")
+
+    # Same data, with the same key or without one
+    assert cache.lookup(data_hash, "key-1") == "job-1"
+    assert cache.lookup(data_hash) == "job-1"
+
+
+def test_key_reused_for_other_data_is_rejected():
+    cache = SubmissionCache()
+    cache.remember(canonical_hash(DATA), "job-1", "key-1")
+
+    with pytest.raises(IdempotencyKeyConflict):
+        cache.lookup(canonical_hash({**DATA, "no": "002/2026"}), "key-1")
+    # A new key for the changed data is a new submission
+    assert cache.lookup(canonical_hash({**DATA, "no": "002/2026"}), "key-2") is None
+
+
+def test_pdf_is_kept_only_for_the_remembered_job():
+    cache = SubmissionCache()
+    data_hash = canonical_hash(DATA)
+    cache.remember(data_hash, "job-1")
+    cache.store_pdf(data_hash, "job-2", b"other")
+    assert cache.get_pdf(data_hash) is None
+    cache.store_pdf(data_hash, "job-1", b"%PDF")
+    assert cache.get_pdf(data_hash) == b"%PDF"
+
+
+def test_entries_expire_and_least_recently_used_are_evicted():
+    cache = TTLCache(max_entries=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.get("c") is None
@@ -0,0 +1,99 @@
+"""Tests for the journaled submission pipeline."""
+import asyncio
+
+from app.jobs import JobStore, SubmissionPipeline
+
+
+class Stages:
+    """Records the stages run; a stage listed in `failing` raises once."""
+
+    def __init__(self, *failing):
+        self.failing = set(failing)
+        self.calls = []
+
+    def pipeline(self, store):
+        return SubmissionPipeline(
+            store,
+            {name: self._stage(name) for name in ("render", "persist", "email")},
+            workers=1
+        )
+
+    def _stage(self, name):
+        async def run(job):
+            self.calls.append(name)
+            if name in self.failing:
+                self.failing.discard(name)
+                raise RuntimeError(f"{name} failed")
+            return {name: True}
+        return run
+
+
+async def wait_for(store, job_id, statuses=("completed", "failed")):
+    for _ in range(500):
+        job = store.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {store.get(job_id)['status']}")
+
+
+def test_job_runs_every_stage(tmp_path):
+    async def scenario():
+        store = JobStore(str(tmp_path / "jobs.db"))
+        stages = Stages()
+        pipeline = stages.pipeline(store)
+        await pipeline.start()
+        job = await wait_for(store, pipeline.submit({"data": {}}))
+        await pipeline.stop()
+        store.close()
+        return stages, job
+
+    stages, job = asyncio.run(scenario())
+    assert stages.calls == ["render", "persist", "email"]
+    assert job["stage"] == "done"
+    assert job["result"] == {"render": True, "persist": True, "email": True}
+
+
+def test_failed_job_is_retried_from_the_failed_stage(tmp_path):
+    async def scenario():
+        store = JobStore(str(tmp_path / "jobs.db"))
+        stages = Stages("persist")
+        pipeline = stages.pipeline(store)
+        await pipeline.start()
+        job_id = pipeline.submit({"data": {}})
+        failed = await wait_for(store, job_id)
+        assert pipeline.retry(job_id)
+        completed = await wait_for(store, job_id, ("completed",))
+        await pipeline.stop()
+        store.close()
+        return stages, failed, completed
+
+    stages, failed, completed = asyncio.run(scenario())
+    assert failed["status"] == "failed"
+    assert failed["stage"] == "persist"
+    assert failed["error"] == "persist failed"
+    assert stages.calls == ["render", "persist", "persist", "email"]
+    assert completed["attempts"] == 2
+
+
+def test_unfinished_job_resumes_after_restart(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    # A crash after the render stage was journaled
+    job_id = store.create({"data": {}}, "render")
+    store.update(job_id, status="running", stage="persist", result={"render": True})
+    store.close()
+
+    async def scenario():
+        restarted = JobStore(str(tmp_path / "jobs.db"))
+        stages = Stages()
+        pipeline = stages.pipeline(restarted)
+        await pipeline.start()
+        job = await wait_for(restarted, job_id)
+        await pipeline.stop()
+        restarted.close()
+        return stages, job
+
+    stages, job = asyncio.run(scenario())
+    assert stages.calls == ["persist", "email"]
+    assert job["status"] == "completed"
+    assert job["result"] == {"render": True, "persist": True, "email": True}
@@ -0,0 +1,140 @@
+"""Tests for the persistent outbound email queue (fake Gmail backend)."""
+import json
+import sqlite3
+import time
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app.backends import FakeConditions, FakeGmailBackend
+from app.email_service import EmailService
+from app.mail_queue import MailQueue
+
+
+EMAIL = {
+    "client_email": "ion.popescu@example.com",
+    "client_name": "Ion Popescu",
+    "student_name": "Mihai Popescu",
+    "contract_pdf_path": "contract.pdf",
+    "admin_email": "admin@example.com",
+}
+
+
+def make_email_service(conditions):
+    return EmailService("", "", "", backend=FakeGmailBackend(conditions))
+
+
+def make_queue(tmp_path, email_service, statuses=None, **options):
+    options = {"rate_per_second": 0, "base_delay": 0.01, **options}
+    if statuses is not None:
+        options["on_status"] = lambda contract_no, status: statuses.append((contract_no, status))
+    return MailQueue(email_service, str(tmp_path / "mail_queue.db"), **options)
+
+
+def wait_for(queue, mail_id, statuses=("sent", "failed"), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        mail = queue.get(mail_id)
+        if mail["status"] in statuses:
+            return mail
+        time.sleep(0.01)
+    pytest.fail(f"mail {mail_id} still {queue.get(mail_id)['status']}")
+
+
+class FlakyEmailService:
+    """Fails with the given HTTP statuses, then succeeds."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def send_contract_email(self, raise_errors=False, **params):
+        self.calls += 1
+        if self.statuses:
+            status = self.statuses.pop(0)
+            raise HttpError(httplib2.Response({"status": status}), json.dumps({"error": {}}).encode())
+        return True
+
+
+def test_queued_email_is_sent_with_its_attachment(tmp_path):
+    conditions = FakeConditions()
+    email_service = make_email_service(conditions)
+    statuses = []
+    queue = make_queue(tmp_path, email_service, statuses)
+    queue.start()
+
+    mail_id = queue.enqueue_contract_email("001/2026", contract_pdf=b"%PDF-1.7 test", **EMAIL)
+    mail = wait_for(queue, mail_id)
+    queue.close()
+
+    assert mail["status"] == "sent"
+    assert statuses == [("001/2026", "Sent")]
+    assert email_service.get_metrics()["sent"] == 1
+    # The stored attachment is dropped once the mail is sent
+    with sqlite3.connect(tmp_path / "mail_queue.db") as conn:
+        assert conn.execute("SELECT attachment FROM mails WHERE id = ?", (mail_id,)).fetchone()[0] is None
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_rate_limits_and_server_errors_are_retried(tmp_path, status):
+    email_service = FlakyEmailService(status, status)
+    queue = make_queue(tmp_path, email_service)
+    queue.start()
+
+    mail_id = queue.enqueue_contract_email("001/2026", **EMAIL)
+    mail = wait_for(queue, mail_id)
+    queue.close()
+
+    assert mail["status"] == "sent"
+    assert mail["attempts"] == 3
+    assert email_service.calls == 3
+
+
+def test_client_errors_fail_without_retry(tmp_path):
+    email_service = FlakyEmailService(400)
+    statuses = []
+    queue = make_queue(tmp_path, email_service, statuses)
+    queue.start()
+
+    mail_id = queue.enqueue_contract_email("001/2026", **EMAIL)
+    mail = wait_for(queue, mail_id)
+    queue.close()
+
+    assert mail["status"] == "failed"
+    assert email_service.calls == 1
+    assert statuses == [("001/2026", "Failed")]
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    email_service = make_email_service(FakeConditions(error_rate=1.0))
+    queue = make_queue(tmp_path, email_service, max_attempts=3)
+    queue.start()
+
+    mail_id = queue.enqueue_contract_email("001/2026", **EMAIL)
+    mail = wait_for(queue, mail_id)
+    queue.close()
+
+    assert mail["status"] == "failed"
+    assert mail["attempts"] == 3
+    assert "500" in mail["last_error"]
+
+
+def test_unsent_mail_is_sent_after_restart(tmp_path):
+    email_service = make_email_service(FakeConditions())
+    queue = make_queue(tmp_path, email_service)
+    queued_id = queue.enqueue_contract_email("001/2026", contract_pdf=b"%PDF", **EMAIL)
+    sending_id = queue.enqueue_contract_email("002/2026", **EMAIL)
+    queue.close()
+
+    # A crash while sending leaves the message marked "sending"
+    with sqlite3.connect(tmp_path / "mail_queue.db") as conn:
+        conn.execute("UPDATE mails SET status = 'sending' WHERE id = ?", (sending_id,))
+
+    restarted = make_queue(tmp_path, email_service)
+    assert restarted.depth() == 2
+    restarted.start()
+    assert wait_for(restarted, queued_id)["status"] == "sent"
+    assert wait_for(restarted, sending_id)["status"] == "sent"
+    restarted.close()
+    assert email_service.get_metrics()["sent"] == 2
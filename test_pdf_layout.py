@@ -0,0 +1,60 @@
+"""Tests for fitting long values into their boxes in the contract PDF."""
+import logging
+
+import fitz
+import pytest
+
+from app.config import settings
+from app.pdf_handler import PDFHandler
+
+
+FITTED_KEYS = ("contact_address", "subscriptions_types", "timeslots")
+
+
+@pytest.fixture(scope="module")
+def handler():
+    return PDFHandler(settings.contract_pdf_path)
+
+
+def page_text(pdf_bytes):
+    """All text of a PDF with whitespace (including line breaks) collapsed."""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return " ".join(" ".join(page.get_text() for page in doc).split())
+
+
+def as_rendered(handler, value):
+    """A value as the page text reads back.
+
+    Without the template fonts, text is written in base-14 fonts whose
+    encoding has no ă, ș or ț (see fonts/README.md); they read back as "·".
+    """
+    value = " ".join(value.split())
+    if handler.fonts.get("PalatinoLinotype-Bold") is not None:
+        return value
+    return "".join(char if char.encode("cp1252", "ignore") else "·" for char in value)
+
+
+def test_long_values_are_rendered_in_full(handler, long_data, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.pdf_handler"):
+        text = page_text(handler.render_pdf(long_data))
+
+    for key in FITTED_KEYS:
+        assert as_rendered(handler, long_data[key]) in text, key
+    # Every value fits the free space around its placeholder
+    assert not [record for record in caplog.records if hasattr(record, "field")]
+
+
+def test_values_that_never_fit_overflow_instead_of_being_cut(handler, short_data, caplog):
+    data = {
+        **short_data,
+        "contact_address": " ".join(["Strada Foarte Lungă nr. 1000"] * 20),
+        "timeslots": "\n".join(f"Ziua {number}: 10:00-12:00" for number in range(20)),
+    }
+    with caplog.at_level(logging.WARNING, logger="app.pdf_handler"):
+        text = page_text(handler.render_pdf(data))
+
+    assert as_rendered(handler, data["contact_address"]) in text
+    assert as_rendered(handler, data["timeslots"]) in text
+    assert {record.field for record in caplog.records if hasattr(record, "field")} == {
+        "contact_address", "timeslots"
+    }
@@ -0,0 +1,58 @@
+"""Tests for the local SQLite mirror of the submissions sheet."""
+from app.sheet_mirror import main
+
+
+def submit(sheets, no, email):
+    sheets.append_submission({"no": no, "contact_email": email, "contact_cnp": "1900101123456"})
+    assert sheets.buffer.flush()
+
+
+def test_sync_copies_only_new_rows(sheets, mirror):
+    submit(sheets, "001/2026", "Ion.Popescu@example.com")
+    assert mirror.sync() == 2  # header and first submission
+    submit(sheets, "002/2026", "maria@example.com")
+    assert mirror.sync() == 1
+    assert mirror.sync() == 0
+
+    assert mirror.contract_numbers() == [(2, "001/2026"), (3, "002/2026")]
+    assert mirror.row_number("002/2026") == 3
+    # Emails are matched case-insensitively
+    assert [row["contract_no"] for row in mirror.find(contact_email="ion.popescu@EXAMPLE.com")] == ["001/2026"]
+
+
+def test_rebuild_picks_up_manual_edits(sheets_backend, sheets, mirror):
+    submit(sheets, "001/2026", "ion@example.com")
+    mirror.sync()
+
+    # Someone corrects the contract number in the sheet by hand
+    sheets_backend.spreadsheet.worksheet("Sheet1").rows[1][1] = "101/2026"
+    mirror.sync()
+    assert mirror.row_number("101/2026") is None
+
+    assert mirror.rebuild() == 2
+    assert mirror.row_number("101/2026") == 2
+    assert mirror.find(contract_no="001/2026") == []
+
+
+def test_command_line_finds_submissions(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("app.sheet_mirror.settings.sheets_backend", "fake")
+    monkeypatch.setattr("app.sheet_mirror.settings.sheet_mirror_db_path", str(tmp_path / "cli.db"))
+
+    assert main(["--rebuild"]) == 0
+    assert main(["--no", "001/2026"]) == 1
+    assert capsys.readouterr().out.strip() == "[]"
+
+
+def test_full_grid_is_not_an_error(sheets_backend, sheets, mirror, caplog):
+    submit(sheets, "001/2026", "ion@example.com")
+    worksheet = sheets_backend.spreadsheet.worksheet("Sheet1")
+    worksheet.row_count = len(worksheet.rows)
+    assert mirror.sync() == 2
+
+    # The next range starts below the grid: no new rows, nothing logged
+    assert mirror.sync() == 0
+    assert not [record for record in caplog.records if record.levelname == "ERROR"]
+
+    # Appends grow the grid
+    submit(sheets, "002/2026", "maria@example.com")
+    assert mirror.sync() == 1
@@ -0,0 +1,65 @@
+"""Tests for the buffered Google Sheets writes (fake Sheets backend)."""
+
+
+def contract(no):
+    return {"no": no, "contact_email": f"{no.replace('/', '-')}@example.com"}
+
+
+def contract_numbers(backend):
+    return [row[1] for row in backend.spreadsheet.worksheet("Sheet1").rows[1:]]
+
+
+def test_flush_appends_buffered_rows_in_one_batch(tmp_path, sheets_backend, sheets):
+    sheets.append_submission(contract("001/2026"))
+    sheets.append_submission(contract("002/2026"))
+    assert sheets.buffer.depth() == 2
+    assert (tmp_path / "spill.jsonl").exists()
+
+    assert sheets.buffer.flush()
+    assert contract_numbers(sheets_backend) == ["001/2026", "002/2026"]
+    assert sheets.buffer.depth() == 0
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+def test_failed_append_is_requeued_and_flushed_later(sheets_backend, sheets):
+    sheets.append_submission(contract("001/2026"))
+
+    sheets_backend.conditions.fail_next("append_rows", 500)
+    assert not sheets.buffer.flush()
+    assert sheets.buffer.depth() == 1
+    assert contract_numbers(sheets_backend) == []
+
+    assert sheets.buffer.flush()
+    assert contract_numbers(sheets_backend) == ["001/2026"]
+
+
+def test_unflushed_rows_are_replayed_after_restart(sheets_backend, make_sheets):
+    service = make_sheets()
+    service.append_submission(contract("001/2026"))
+    # Simulate a crash: the flusher never runs
+    service.buffer._stopped.set()
+
+    restarted = make_sheets()
+    assert restarted.buffer.depth() == 1
+    assert restarted.buffer.flush()
+    assert contract_numbers(sheets_backend) == ["001/2026"]
+
+
+def test_status_failure_after_append_does_not_replay_rows(sheets_backend, make_sheets):
+    service = make_sheets()
+    service.append_submission(contract("001/2026"))
+    assert service.buffer.flush()
+
+    service.update_contract_email_status("001/2026", "Sent")
+    service.append_submission(contract("002/2026"))
+
+    # The append succeeds, the status batch_update is rate limited
+    sheets_backend.conditions.fail_next("batch_update", 429)
+    assert not service.buffer.flush()
+    service.buffer._stopped.set()
+
+    # A restart replays only the status update, not the appended row
+    restarted = make_sheets()
+    assert restarted.buffer.flush()
+    assert contract_numbers(sheets_backend) == ["001/2026", "002/2026"]
+    assert sheets_backend.spreadsheet.worksheet("Sheet1").rows[1][23] == "Sent"
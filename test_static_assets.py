@@ -0,0 +1,77 @@
+"""Tests for fingerprinted static assets and ETag revalidation."""
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    CachedAsset,
+    FingerprintedStaticFiles,
+)
+
+
+CSS = b"body { margin: 0; }\n" * 100
+
+
+@pytest.fixture
+def static(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "form.css").write_bytes(CSS)
+    return FingerprintedStaticFiles(directory=str(tmp_path))
+
+
+@pytest.fixture
+def client(static):
+    app = FastAPI()
+    app.mount("/static", static, name="static")
+    return TestClient(app)
+
+
+def test_matching_etag_is_answered_with_304():
+    asset = CachedAsset(CSS, "text/css")
+    response = asset.response({"if-none-match": asset.etag}, REVALIDATE_CACHE_CONTROL)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == asset.etag
+
+    # Weak and listed validators match too
+    for header in (f"W/{asset.etag}", f'"other", {asset.etag}', "*"):
+        assert asset.response({"if-none-match": header}, REVALIDATE_CACHE_CONTROL).status_code == 304
+    assert asset.response({"if-none-match": '"other"'}, REVALIDATE_CACHE_CONTROL).status_code == 200
+
+
+def test_each_encoding_has_its_own_etag():
+    asset = CachedAsset(CSS, "text/css")
+    body, encoding, etag = asset.select("gzip;q=1, identity")
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == CSS
+    assert etag != asset.etag
+
+    # q=0 refuses an encoding
+    assert asset.select("gzip;q=0") == (CSS, None, asset.etag)
+
+
+def test_fingerprinted_url_is_cached_for_a_year(static, client):
+    url = static.url("css/form.css")
+    assert url.startswith("/static/css/form.") and url.endswith(".css")
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content == CSS
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_plain_and_stale_urls_are_revalidated(client):
+    response = client.get("/static/css/form.css")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+
+    # An outdated fingerprint is not served as immutable
+    assert client.get("/static/css/form.000000000000.css").status_code == 404